@@ -0,0 +1,181 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from alerts import format_alert, format_digest
+from notifications import get_outbox
+
+DIGEST_WINDOW = 60
+# Per ticker and direction: a reversal during the cooldown is still pushed
+TICKER_COOLDOWN = 30 * 60
+# A (ticker, direction, band) breach is only ever pushed once within this span
+DEDUPE_TTL = 24 * 60 * 60
+BAND_DECIMALS = 2
+
+# Everything is kept per recipient (a hash of the push token), like the outbox
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_sent (
+    recipient TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    band TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (recipient, ticker, direction, band)
+);
+CREATE TABLE IF NOT EXISTS alert_cooldown (
+    recipient TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    until REAL NOT NULL,
+    PRIMARY KEY (recipient, ticker, direction)
+);
+CREATE TABLE IF NOT EXISTS alert_pending (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    price REAL NOT NULL,
+    band REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class AlertCoalescer:
+    # Sits in front of the push outbox. Breaches are deduplicated and
+    # rate limited per ticker and direction across every session and process sharing the
+    # database, then grouped into one digest push per window. Lives in the
+    # outbox's database so a digest is queued in the same transaction that
+    # consumes its pending rows.
+    def __init__(self, outbox, window=DIGEST_WINDOW, cooldown=TICKER_COOLDOWN):
+        self.outbox = outbox
+        self.recipient = outbox.recipient
+        self.path = Path(outbox.path)
+        self.window = window
+        self.cooldown = cooldown
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._thread = None
+        conn = self._conn()
+        # Tables from before rows were scoped to a recipient hold only short-lived
+        # dedupe and cooldown entries, so they are recreated rather than migrated
+        if "recipient" not in {row[1] for row in conn.execute("PRAGMA table_info(alert_pending)")}:
+            conn.executescript(
+                "DROP TABLE IF EXISTS alert_sent; DROP TABLE IF EXISTS alert_cooldown; DROP TABLE IF EXISTS alert_pending;"
+            )
+        elif "direction" not in {row[1] for row in conn.execute("PRAGMA table_info(alert_cooldown)")}:
+            conn.execute("DROP TABLE IF EXISTS alert_cooldown")
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, ticker, direction, price, band):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO alert_sent (recipient, ticker, direction, band, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.recipient, ticker, direction, f"{band:.{BAND_DECIMALS}f}", now),
+            )
+            if cur.rowcount == 0:
+                conn.execute("ROLLBACK")
+                return False
+            row = conn.execute(
+                "SELECT until FROM alert_cooldown WHERE recipient = ? AND ticker = ? AND direction = ?",
+                (self.recipient, ticker, direction),
+            ).fetchone()
+            if row and row[0] > now:
+                # Keep the dedupe row so the same breach is not retried after the cooldown
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT INTO alert_cooldown (recipient, ticker, direction, until) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(recipient, ticker, direction) DO UPDATE SET until = excluded.until",
+                (self.recipient, ticker, direction, now + self.cooldown),
+            )
+            conn.execute(
+                "INSERT INTO alert_pending (recipient, ticker, direction, price, band, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.recipient, ticker, direction, float(price), float(band), now),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def submit_alert(self, alert):
+        return self.submit(alert["ticker"], alert["direction"], alert["price"], alert["band"])
+
+    def flush(self, force=False):
+        # The digest is queued in the transaction that deletes its pending rows:
+        # a busy database leaves both in place for the next tick
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            oldest = conn.execute(
+                "SELECT MIN(created_at) FROM alert_pending WHERE recipient = ?", (self.recipient,)
+            ).fetchone()[0]
+            if oldest is None or (not force and now - oldest < self.window):
+                conn.execute("ROLLBACK")
+                return None
+            rows = conn.execute(
+                "SELECT id, ticker, direction, price, band FROM alert_pending WHERE recipient = ? ORDER BY id",
+                (self.recipient,),
+            ).fetchall()
+            alerts = [
+                {"ticker": t, "direction": d, "price": p, "band": b}
+                for _, t, d, p, b in rows
+            ]
+            title, body = format_alert(alerts[0]) if len(alerts) == 1 else format_digest(alerts)
+            conn.execute(
+                "DELETE FROM alert_pending WHERE recipient = ? AND id <= ?", (self.recipient, rows[-1][0])
+            )
+            conn.execute("DELETE FROM alert_sent WHERE created_at < ?", (now - DEDUPE_TTL,))
+            message_id = self.outbox.insert(conn, title, body)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.outbox.wake()
+        return message_id
+
+    def _run(self):
+        while not self._stop.wait(1.0):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Locked by another process; the pending rows are picked up next tick
+                continue
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="alert-digest", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_coalescers = {}
+_coalescers_lock = threading.Lock()
+
+
+def get_coalescer(token):
+    with _coalescers_lock:
+        if token not in _coalescers:
+            _coalescers[token] = AlertCoalescer(get_outbox(token)).start()
+        return _coalescers[token]
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_DB = Path(os.getenv("ALERT_DB", Path(__file__).parent / "data" / "alerts.sqlite3"))
+# A closed tab's watchlist keeps being checked for this long after it was last seen
+MEMBER_TTL = 7 * 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_state (
+    ticker TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watchlist_member (
+    session_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (session_id, ticker)
+);
+CREATE INDEX IF NOT EXISTS watchlist_member_seen ON watchlist_member (seen_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class AlertStore:
+    # Shared between the Streamlit app, every browser session and the alert worker,
+    # so alert state survives reloads and is not duplicated per tab.
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            # Shared watchlist from before membership was tracked per session
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'watchlist'").fetchone():
+                conn.execute(
+                    "INSERT OR IGNORE INTO watchlist_member (session_id, ticker, seen_at) "
+                    "SELECT 'legacy', ticker, ? FROM watchlist",
+                    (time.time(),),
+                )
+                conn.execute("DROP TABLE watchlist")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def states(self):
+        return dict(self._conn().execute("SELECT ticker, state FROM alert_state"))
+
+    def transition(self, ticker, state):
+        # Atomic compare-and-set: only one process wins a given state change
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO alert_state (ticker, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(ticker) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at "
+                "WHERE alert_state.state != excluded.state",
+                (ticker, state, utc_now()),
+            )
+            return cur.rowcount > 0
+
+    def touch_watchlist(self, session_id, tickers):
+        # Replaces one session's membership; a remove in one tab leaves every
+        # other tab's tickers, and the shared alert state, alone
+        tickers = list(dict.fromkeys(tickers))
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                f"DELETE FROM watchlist_member WHERE session_id = ? "
+                f"AND ticker NOT IN ({', '.join('?' * len(tickers))})",
+                [session_id, *tickers],
+            )
+            conn.executemany(
+                "INSERT INTO watchlist_member (session_id, ticker, seen_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id, ticker) DO UPDATE SET seen_at = excluded.seen_at",
+                [(session_id, t, now) for t in tickers],
+            )
+
+    def tickers(self, ttl=MEMBER_TTL):
+        return [row[0] for row in self._conn().execute(
+            "SELECT ticker FROM watchlist_member WHERE seen_at >= ? GROUP BY ticker ORDER BY MIN(seen_at), ticker",
+            (time.time() - ttl,),
+        )]
+
+    def prune(self, ttl=MEMBER_TTL, keep=()):
+        # Forget sessions not seen within `ttl`, and the alert state of tickers
+        # no session watches any more, except those in `keep` (the worker's own list)
+        keep = set(keep)
+        with self._conn() as conn:
+            conn.execute("DELETE FROM watchlist_member WHERE seen_at < ?", (time.time() - ttl,))
+            unwatched = conn.execute(
+                "SELECT ticker FROM alert_state WHERE ticker NOT IN (SELECT ticker FROM watchlist_member)"
+            ).fetchall()
+            conn.executemany("DELETE FROM alert_state WHERE ticker = ?", [t for t in unwatched if t[0] not in keep])
+
+    def set_meta(self, key, value):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, str(value)),
+            )
+
+    def get_meta(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+
+_default_store = None
+
+
+def default_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = AlertStore()
+    return _default_store
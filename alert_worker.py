@@ -0,0 +1,93 @@
+"""Headless SMA15 band alert worker.
+
+Run alongside the dashboard, e.g. ``python alert_worker.py --interval 300``.
+Deliberately imports neither Streamlit nor Plotly so it starts fast.
+"""
+import argparse
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+from alert_store import default_store, utc_now
+from alerts import evaluate_alerts, format_alert
+from fetch_planner import FetchPlan
+from indicators import SMA_WINDOW, compute_bands
+from market_calendar import next_refresh, ny_now
+from alert_digest import AlertCoalescer
+from notifications import PushOutbox
+from request_scheduler import ALERT
+
+DEFAULT_TICKERS = ["TSLA", "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA"]
+DEFAULT_INTERVAL = 300
+# The SMA window plus the previous close; with a warm bar store a cycle only
+# re-requests the latest day
+ALERT_SESSIONS = SMA_WINDOW + 1
+
+log = logging.getLogger("alert_worker")
+
+
+def load_watchlist(store):
+    tickers = [t.strip().upper() for t in os.getenv("WATCHLIST", "").split(",") if t.strip()]
+    tickers += store.tickers()
+    return list(dict.fromkeys(tickers)) or DEFAULT_TICKERS
+
+
+def run_once(store, digest):
+    tickers = load_watchlist(store)
+    plan = FetchPlan().need("alerts", tickers, sessions=ALERT_SESSIONS).fetch(priority=ALERT)
+    bands = compute_bands(plan.frames_for("alerts"))
+
+    alerts = evaluate_alerts(bands.latest, store)
+    for alert in alerts:
+        title, body = format_alert(alert)
+        log.info("%s", body)
+        if digest is not None:
+            digest.submit_alert(alert)
+
+    # After evaluating, so the WATCHLIST/default tickers keep their state too
+    store.prune(keep=tickers)
+    store.set_meta("worker_last_run", utc_now())
+    log.info("checked %d/%d tickers, %d alerts", len(bands.latest), len(tickers), len(alerts))
+    return alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL, help="seconds between checks while the market is open")
+    parser.add_argument("--once", action="store_true", help="run a single check and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    load_dotenv()
+    token = os.getenv("PUSHBULLET_TOKEN")
+    if not token:
+        log.warning("PUSHBULLET_TOKEN is not set, alerts will only be logged")
+
+    store = default_store()
+    outbox = PushOutbox(token).start() if token else None
+    digest = AlertCoalescer(outbox).start() if outbox else None
+    while True:
+        started = time.monotonic()
+        try:
+            run_once(store, digest)
+        except Exception:
+            log.exception("alert check failed")
+        if args.once:
+            break
+        # No new bars overnight, on weekends or on holidays; sleep through them
+        due = next_refresh(cadence=max(0, args.interval - (time.monotonic() - started)))
+        log.info("next check at %s", due.isoformat(timespec="minutes"))
+        time.sleep(max(0, (due - ny_now()).total_seconds()))
+
+    if outbox is not None:
+        # Give queued pushes a chance to go out before a --once run exits
+        digest.stop()
+        digest.flush(force=True)
+        outbox.drain_once()
+        outbox.stop(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
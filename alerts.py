@@ -0,0 +1,35 @@
+from indicators import ABOVE, BELOW, NEUTRAL
+
+STATE_NAMES = {ABOVE: "above", BELOW: "below", NEUTRAL: "neutral"}
+
+
+def evaluate_alerts(latest, store):
+    # SMA15 +/-5% rule: alert once when a ticker crosses a band, re-arm when it
+    # comes back inside.
+    alerts = []
+    for ticker, row in latest.iterrows():
+        state = STATE_NAMES[int(row["state"])]
+        if not store.transition(ticker, state) or state == "neutral":
+            continue
+        alerts.append({
+            "ticker": ticker,
+            "direction": state,
+            "price": float(row["current"]),
+            "band": float(row["upper"] if state == "above" else row["lower"]),
+        })
+    return alerts
+
+
+def format_alert(alert):
+    ticker, price, band = alert["ticker"], alert["price"], alert["band"]
+    if alert["direction"] == "above":
+        return f"{ticker} Alert: Above Upper Limit", f"{ticker} price ${price:.2f} > upper ${band:.2f}"
+    return f"{ticker} Alert: Below Lower Limit", f"{ticker} price ${price:.2f} < lower ${band:.2f}"
+
+
+def format_digest(alerts):
+    above = sum(1 for a in alerts if a["direction"] == "above")
+    below = len(alerts) - above
+    title = f"{len(alerts)} Band Alerts ({above} above, {below} below)"
+    body = "\n".join(format_alert(a)[1] for a in sorted(alerts, key=lambda a: a["ticker"]))
+    return title, body
@@ -0,0 +1,188 @@
+import contextlib
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+from indicators import BAND_PCT, SMA_WINDOW
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+DEFAULT_ROOT = Path(os.getenv("BAR_STORE_DIR", Path(__file__).parent / "data" / "bars"))
+OHLCV = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+# Aggregate levels kept next to the daily bars: level -> (resample rule, period frequency)
+LEVELS = {
+    "1wk": ("W-FRI", "W-FRI"),
+    "1mo": ("ME", "M"),
+}
+SMA_COLUMN = f"SMA{SMA_WINDOW}"
+
+
+def normalize_bars(df):
+    if df is None or df.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    df = df[[c for c in BAR_COLUMNS if c in df.columns]].copy()
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.normalize().rename("Date")
+    return df[~df.index.duplicated(keep="last")].sort_index()
+
+
+def aggregate_bars(daily, rule):
+    agg = {c: how for c, how in OHLCV.items() if c in daily.columns}
+    return daily.resample(rule).agg(agg).dropna(subset=["Close"])
+
+
+def add_bands(level, start=0):
+    # Fills SMA/band columns from row `start` on, reading only the window of
+    # closes before it, so appending a period does not redo the whole series
+    context = max(0, start - (SMA_WINDOW - 1))
+    sma = level["Close"].iloc[context:].rolling(SMA_WINDOW).mean().to_numpy()[start - context:]
+    for column in (SMA_COLUMN, "Upper", "Lower"):
+        if column not in level.columns:
+            level[column] = float("nan")
+    rows = level.index[start:]
+    level.loc[rows, SMA_COLUMN] = sma
+    level.loc[rows, "Upper"] = sma * (1 + BAND_PCT)
+    level.loc[rows, "Lower"] = sma * (1 - BAND_PCT)
+    return level
+
+
+class BarStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def path(self, ticker):
+        return self.root / f"{ticker.upper()}.parquet"
+
+    def load(self, ticker):
+        path = self.path(ticker)
+        if not path.exists():
+            return normalize_bars(None)
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            # A corrupt file is treated as a cold start and rewritten on the next merge
+            return normalize_bars(None)
+
+    def coverage_path(self, ticker):
+        return self.root / f"{ticker.upper()}.from"
+
+    def covered_from(self, ticker):
+        # Earliest date upstream has been asked for: the store holds everything
+        # upstream has from there on, even when the first bar is much later
+        try:
+            return pd.Timestamp(self.coverage_path(ticker).read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _set_covered_from(self, ticker, start):
+        start = pd.Timestamp(start).normalize()
+        current = self.covered_from(ticker)
+        if current is None or start < current:
+            self.coverage_path(ticker).write_text(start.date().isoformat())
+
+    @contextlib.contextmanager
+    def _locked(self, ticker):
+        # The worker and the app read, merge and write the same files; a file lock
+        # keeps one process from overwriting rows the other just merged
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / f".{ticker.upper()}.lock", "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
+    def modified(self, ticker):
+        path = self.path(ticker)
+        return datetime.fromtimestamp(path.stat().st_mtime) if path.exists() else None
+
+    def level_path(self, ticker, level):
+        return self.root / level / f"{ticker.upper()}.parquet"
+
+    def save(self, ticker, df):
+        self._write(self.path(ticker), df)
+
+    def _write(self, path, df):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # The worker and the app merge into the same store, so each writer gets its
+        # own temp file; a shared name let one clobber the other's half-written file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+    def load_level(self, ticker, level):
+        path = self.level_path(ticker, level)
+        if path.exists():
+            try:
+                return pd.read_parquet(path)
+            except Exception:
+                pass
+        # Daily bars stored before the levels existed, or a corrupt file: rebuild once
+        with self._locked(ticker):
+            return self._update_level(ticker, level, self.load(ticker), None)
+
+    def _update_level(self, ticker, level, daily, changed_from):
+        rule, freq = LEVELS[level]
+        path = self.level_path(ticker, level)
+        stored = pd.read_parquet(path) if path.exists() and changed_from is not None else None
+        if stored is None or stored.empty or changed_from < stored.index[0]:
+            out = add_bands(aggregate_bars(daily, rule))
+        else:
+            # Only the period holding the first changed day onwards is re-aggregated
+            period = pd.Period(changed_from, freq)
+            keep = stored.loc[stored.index < period.start_time]
+            fresh = aggregate_bars(daily.loc[daily.index >= period.start_time], rule)
+            out = add_bands(pd.concat([keep, fresh]), start=len(keep))
+        self._write(path, out)
+        return out
+
+    def merge(self, ticker, new_bars, covered_from=None):
+        # covered_from records a backfill, written only once its bars are on disk
+        new_bars = normalize_bars(new_bars)
+        with self._locked(ticker):
+            stored = self.load(ticker)
+            if new_bars.empty:
+                return stored
+            combined = pd.concat([stored, new_bars]) if not stored.empty else new_bars
+            # Newer rows win so a bar captured mid-session gets replaced by the final one
+            combined = combined[~combined.index.duplicated(keep="last")].sort_index()
+            self.save(ticker, combined)
+            for level in LEVELS:
+                self._update_level(ticker, level, combined, new_bars.index[0])
+            if covered_from is not None:
+                self._set_covered_from(ticker, covered_from)
+            return combined
+
+
+bar_store = BarStore()
+
+
+def level_for(days):
+    # Coarsest level that still gives a card a few hundred points over `days`
+    if days <= 2 * 365:
+        return "1d"
+    if days <= 8 * 365:
+        return "1wk"
+    return "1mo"
+
+
+def slice_bars(df, start, end):
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+    return df.loc[(df.index >= start) & (df.index <= end)]
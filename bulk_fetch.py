@@ -0,0 +1,335 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from datetime import timedelta
+
+import pandas as pd
+import yfinance as yf
+
+from bar_store import bar_store, slice_bars
+from price_cache import cache_key, history_cache, negative_cache
+from request_scheduler import CARD, PREFETCH, RetryableError, scheduler
+
+# A stored series starting later than this after the requested start needs a backfill
+BACKFILL_SLACK = timedelta(days=7)
+
+YF_RATE_LIMIT = getattr(getattr(yf, "exceptions", None), "YFRateLimitError", RetryableError)
+
+
+def _yf_call(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except YF_RATE_LIMIT as e:
+        raise RetryableError(str(e))
+
+
+def _history(ticker, start, end, interval):
+    return yf.Ticker(ticker).history(start=start, end=end, interval=interval)
+
+
+def _valid_rows(df):
+    if "Close" in df.columns:
+        return df.dropna(subset=["Close"])
+    return df.dropna(how="all")
+
+
+def split_download(raw, tickers):
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+    if isinstance(raw.columns, pd.MultiIndex):
+        available = set(raw.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker in available:
+                frames[ticker] = _valid_rows(raw[ticker])
+    elif len(tickers) == 1:
+        frames[tickers[0]] = _valid_rows(raw)
+    return frames
+
+
+class UpstreamUnavailable(Exception):
+    pass
+
+
+def _download(tickers, **kwargs):
+    frames = split_download(yf.download(tickers=tickers, **kwargs), tickers)
+    if len(tickers) > 1 and all(df.empty for df in frames.values()):
+        # yfinance logs network errors and hands back an empty frame; a batch with
+        # no data for any of several symbols is an outage, not a list of bad symbols.
+        # A lone symbol is more likely a typo and gets its per-ticker fallback.
+        raise UpstreamUnavailable(f"no data for any of {len(tickers)} symbols")
+    return frames
+
+
+def _submit(fn, *args, priority=CARD, **kwargs):
+    # Calls made while leading a single-flight are registered with it, so a more
+    # urgent follower can pull them forward in the queue
+    flight = getattr(_leading, "flight", None)
+    if flight is not None:
+        return flight.submit("yfinance", fn, *args, **kwargs)
+    return scheduler.submit("yfinance", fn, *args, priority=priority, **kwargs)
+
+
+def download_batch(tickers, start, end, interval="1d", priority=CARD):
+    # Raising here records the failure on the yfinance circuit breaker
+    try:
+        return _submit(
+            _yf_call,
+            _download,
+            list(tickers),
+            priority=priority,
+            start=start,
+            end=end,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+        ).result()
+    except Exception as e:
+        raise UpstreamUnavailable(str(e)) from e
+
+
+def fetch_upstream(tickers, start, end, interval="1d", priority=CARD):
+    fetched = download_batch(tickers, start, end, interval, priority)
+    frames = {}
+    retries = {}
+    errors = 0
+    for ticker in tickers:
+        df = fetched.get(ticker)
+        if df is None or df.empty or "Close" not in df.columns:
+            # Only symbols that failed in the batch fall back to a single request
+            try:
+                retries[ticker] = _submit(_yf_call, _history, ticker, start, end, interval, priority=priority)
+            except Exception:
+                continue
+        else:
+            frames[ticker] = df
+    for ticker, future in retries.items():
+        try:
+            df = future.result()
+        except Exception:
+            errors += 1
+            continue
+        if not df.empty:
+            frames[ticker] = df
+    if not frames and errors and errors == len(retries):
+        # The batch came back empty and every fallback failed too
+        raise UpstreamUnavailable(f"fallback failed for {errors} symbols")
+    return frames
+
+
+def _covered(ticker, start):
+    covered = bar_store.covered_from(ticker)
+    return covered is not None and covered <= start
+
+
+def fetch_daily_via_store(tickers, start, end, priority=CARD):
+    start_ts = pd.Timestamp(start).normalize()
+    stored = {ticker: bar_store.load(ticker) for ticker in tickers}
+
+    # Group tickers by the date their refetch has to start from, one batch per group
+    groups = defaultdict(list)
+    backfill = set()
+    for ticker, df in stored.items():
+        if df.empty or (df.index[0] > start_ts + BACKFILL_SLACK and not _covered(ticker, start_ts)):
+            groups[start_ts].append(ticker)
+            backfill.add(ticker)
+        else:
+            # Re-request the last stored day so a partial session bar gets finalised
+            groups[df.index[-1]].append(ticker)
+
+    unavailable = set()
+    for fetch_start, group in groups.items():
+        if fetch_start > pd.Timestamp(end):
+            continue
+        try:
+            fetched = fetch_upstream(group, fetch_start, end, priority=priority)
+        except UpstreamUnavailable:
+            # Keep serving what is on disk; the group is retried on the next miss
+            unavailable.update(group)
+            continue
+        for ticker, df in fetched.items():
+            # A backfilled series that starts later than asked is as complete as it gets
+            stored[ticker] = bar_store.merge(ticker, df, covered_from=fetch_start if ticker in backfill else None)
+
+    frames = {}
+    for ticker, df in stored.items():
+        df = slice_bars(df, start, end)
+        if not df.empty:
+            frames[ticker] = df
+    return frames, unavailable
+
+
+class Flight:
+    # One leader's upstream calls and the priority they run at
+    def __init__(self, priority):
+        self.priority = priority
+        self._jobs = []
+        self._lock = threading.Lock()
+
+    def submit(self, upstream, fn, *args, **kwargs):
+        with self._lock:
+            future = scheduler.submit(upstream, fn, *args, priority=self.priority, **kwargs)
+            self._jobs.append((upstream, future))
+        return future
+
+    def promote(self, priority):
+        with self._lock:
+            if priority >= self.priority:
+                return
+            self.priority = priority
+            jobs = [(upstream, f) for upstream, f in self._jobs if not f.done()]
+        for upstream, future in jobs:
+            scheduler.promote(upstream, future, priority)
+
+
+class SingleFlight:
+    # Concurrent callers asking for the same key share one upstream call: the
+    # first claims it, later ones wait on its future. A follower more urgent
+    # than the leader (a visible card behind a prefetch) raises its priority.
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def claim(self, keys, priority=CARD):
+        owned, waiting, joined = [], {}, set()
+        flight = Flight(priority)
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    self._calls[key] = (Future(), flight)
+                    owned.append(key)
+                else:
+                    waiting[key] = call[0]
+                    joined.add(call[1])
+            self.leaders += len(owned)
+            self.followers += len(waiting)
+        for leader in joined:
+            leader.promote(priority)
+        return owned, waiting, flight
+
+    def resolve(self, key, value):
+        with self._lock:
+            call = self._calls.pop(key, None)
+        if call is not None:
+            call[0].set_result(value)
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "followers": self.followers}
+
+
+in_flight = SingleFlight()
+_leading = threading.local()
+
+
+def fetch_watchlist(tickers, start, end, interval="1d", priority=CARD):
+    frames = {}
+    missing = []
+    for ticker in dict.fromkeys(t.strip().upper() for t in tickers):
+        df = history_cache.get(cache_key(ticker, start, end, interval))
+        if df is not None:
+            frames[ticker] = df
+        elif not negative_cache.blocked(ticker, interval):
+            missing.append(ticker)
+
+    keys = {cache_key(ticker, start, end, interval): ticker for ticker in missing}
+    owned, waiting, flight = in_flight.claim(keys, priority)
+    if owned:
+        fetched = {}
+        _leading.flight = flight
+        try:
+            group = [keys[key] for key in owned]
+            if interval == "1d":
+                fetched, unavailable = fetch_daily_via_store(group, start, end, priority)
+            else:
+                try:
+                    fetched, unavailable = fetch_upstream(group, start, end, interval, priority), set()
+                except UpstreamUnavailable:
+                    unavailable = set(group)
+            for ticker, df in fetched.items():
+                if ticker not in unavailable:
+                    history_cache.put(cache_key(ticker, start, end, interval), df)
+                frames[ticker] = df
+            # With the upstream down or the circuit open, nobody is to blame
+            if not scheduler.circuit_open("yfinance"):
+                for ticker in group:
+                    if ticker in unavailable:
+                        continue
+                    if ticker in fetched:
+                        negative_cache.success(ticker, interval)
+                    else:
+                        negative_cache.failure(ticker, interval)
+        finally:
+            _leading.flight = None
+            # Followers get None for a failed symbol, same as the leader
+            for key in owned:
+                in_flight.resolve(key, fetched.get(keys[key]))
+    for key, future in waiting.items():
+        df = future.result()
+        if df is not None:
+            frames[keys[key]] = df
+
+    return {ticker: df.copy() for ticker, df in frames.items()}
+
+
+def peek_watchlist(tickers, start, end, interval="1d"):
+    # Last known data without touching the network: the in-memory cache even
+    # past its TTL, then the on-disk bar store. Returns the frames, when each
+    # was fetched, and the tickers that need a refresh.
+    frames, as_of, stale = {}, {}, []
+    for ticker in dict.fromkeys(t.strip().upper() for t in tickers):
+        df, fetched_at, fresh = history_cache.peek(cache_key(ticker, start, end, interval))
+        if df is None and interval == "1d":
+            df = slice_bars(bar_store.load(ticker), start, end)
+            fetched_at = bar_store.modified(ticker)
+            if df.empty:
+                df = None
+        if df is not None:
+            frames[ticker] = df.copy()
+            as_of[ticker] = fetched_at
+        if not fresh:
+            stale.append(ticker)
+    return frames, as_of, stale
+
+
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+
+def refreshing(tickers, interval="1d"):
+    # interval=None matches a refresh of any bar size
+    with _prefetch_lock:
+        return [t for t in tickers if any(t == p and interval in (None, i) for p, i in _prefetching)]
+
+
+def prefetch_watchlist(tickers, start, end, interval="1d", priority=PREFETCH):
+    # Warms the cache without blocking the render. Off-screen tickers run
+    # behind every visible request; stale visible cards refresh at CARD priority.
+    with _prefetch_lock:
+        pending = [
+            t for t in dict.fromkeys(t.strip().upper() for t in tickers)
+            if (t, interval) not in _prefetching
+            and not history_cache.contains(cache_key(t, start, end, interval))
+            and not negative_cache.blocked(t, interval)
+        ]
+        _prefetching.update((t, interval) for t in pending)
+    if not pending:
+        return None
+
+    def run():
+        try:
+            fetch_watchlist(pending, start, end, interval, priority=priority)
+        except Exception:
+            pass
+        finally:
+            with _prefetch_lock:
+                _prefetching.difference_update((t, interval) for t in pending)
+
+    thread = threading.Thread(target=run, name="prefetch", daemon=True)
+    thread.start()
+    return thread
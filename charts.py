@@ -0,0 +1,145 @@
+import json
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import numpy as np
+import plotly.graph_objects as go
+from plotly.basedatatypes import BaseFigure
+
+# A card is roughly a third of a wide layout; more points than pixels is wasted payload
+CARD_WIDTH_PX = 400
+CARD_HEIGHT = 250
+FIGURE_CACHE_ENTRIES = 512
+
+
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, per
+    # bucket, the point forming the largest triangle with its neighbours.
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_stop].mean() if next_stop > next_start else x[-1]
+        avg_y = y[next_start:next_stop].mean() if next_stop > next_start else y[-1]
+        bx = x[start:stop]
+        by = y[start:stop]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(df, column, threshold=CARD_WIDTH_PX):
+    valid = df[column].notna().to_numpy()
+    df = df[valid]
+    x = df.index.asi8.astype(float)
+    idx = lttb_indices(x, df[column].to_numpy(dtype=float), threshold)
+    return df.iloc[idx]
+
+
+def card_figure(df, width_px=CARD_WIDTH_PX, height=CARD_HEIGHT, sma_column="SMA15"):
+    sampled = downsample(df, "Adj Close", width_px)
+    # Epoch milliseconds as a float array serialise as one compact typed array on a date axis
+    x = (sampled.index.asi8 // 10**6).astype(np.float64)
+    close = sampled["Adj Close"].to_numpy(dtype=np.float32)
+    sma = sampled[sma_column].to_numpy(dtype=np.float32)
+    upper = sampled["Upper"].to_numpy(dtype=np.float32)
+    lower = sampled["Lower"].to_numpy(dtype=np.float32)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=x, y=close, name="Adj Close"))
+    fig.add_trace(go.Scatter(x=x, y=sma, name=sma_column))
+    fig.add_trace(go.Scatter(x=x, y=upper, name="Upper", line=dict(dash="dot")))
+    fig.add_trace(go.Scatter(x=x, y=lower, name="Lower", line=dict(dash="dot")))
+    fig.update_xaxes(type="date")
+    if len(sampled) and (sampled.index != sampled.index.normalize()).any():
+        # Intraday bars: close the overnight and weekend gaps
+        fig.update_xaxes(rangebreaks=[dict(bounds=["sat", "mon"]), dict(bounds=[16, 9.5], pattern="hour")])
+    fig.update_layout(height=height, margin=dict(l=10, r=10, t=20, b=10), showlegend=True)
+    return fig
+
+
+class FigureCache:
+    def __init__(self, max_entries=FIGURE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared across sessions; an unchanged card skips reshaping and figure construction
+figure_cache = FigureCache()
+
+
+class CachedFigure(BaseFigure):
+    # A figure kept as its Plotly JSON. st.plotly_chart takes it like a Figure,
+    # but to_dict() only parses the string instead of deep-copying every trace,
+    # and each render gets its own dict, so the cached figure cannot be mutated.
+    def __init__(self, spec):
+        self.__dict__["spec"] = spec
+
+    def to_dict(self):
+        return json.loads(self.spec)
+
+
+def cached_figure(key, build):
+    # Like the Altair path's dict, only the serialized spec is cached
+    return CachedFigure(figure_cache.get_or_build(key, lambda: build().to_json()))
+
+
+def bar_key(ticker, df, column="Adj Close"):
+    # The last bar's timestamp and value identify the data, so an intraday
+    # revision of today's close still invalidates the chart
+    if df.empty:
+        return (ticker, None, None, 0)
+    return (ticker, df.index[-1], float(df[column].iloc[-1]), len(df))
+
+
+def cached_card_figure(ticker, df, width_px=CARD_WIDTH_PX, height=CARD_HEIGHT, sma_column="SMA15"):
+    key = ("plotly-card", *bar_key(ticker, df), width_px, height, sma_column)
+    return cached_figure(key, lambda: card_figure(df, width_px, height, sma_column))
+
+
+def line_spec(df, columns, height):
+    chart_df = df[columns].dropna().rename_axis("Date").reset_index().melt("Date")
+    if chart_df.empty:
+        return None
+    return alt.Chart(chart_df).mark_line().encode(
+        x=alt.X("Date:T", title=None),
+        y=alt.Y("value:Q", title=None),
+        color=alt.Color("variable:N", title="Legend")
+    ).properties(height=height).to_dict()
+
+
+def cached_line_spec(ticker, df, height, columns=("Adj Close", "SMA15", "Upper", "Lower")):
+    # Vega-Lite spec for st.vega_lite_chart; None when there is nothing to draw
+    key = ("altair-line", *bar_key(ticker, df), height, columns)
+    return figure_cache.get_or_build(key, lambda: line_spec(df, list(columns), height))
@@ -0,0 +1,82 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from bulk_fetch import fetch_watchlist, peek_watchlist, prefetch_watchlist
+from market_calendar import session_start
+from request_scheduler import CARD
+
+# Covers a trading day that has not printed its first bar yet
+SESSION_SLACK = 1
+
+
+class FetchPlan:
+    # Consumers state how much history they need; each ticker is fetched once
+    # over the widest window any consumer asked for, and every consumer reads
+    # back only its own slice.
+    def __init__(self, end=None, interval="1d"):
+        self.end = end or datetime.today()
+        self.interval = interval
+        self.frames = {}
+        self.as_of = {}
+        self.stale = []
+        self._needs = defaultdict(dict)
+
+    def need(self, consumer, tickers, days=None, sessions=None):
+        if sessions is not None:
+            start = pd.Timestamp(session_start(sessions + SESSION_SLACK, self.end))
+        else:
+            start = pd.Timestamp(self.end - timedelta(days=days)).normalize()
+        needs = self._needs[consumer]
+        for ticker in tickers:
+            ticker = ticker.strip().upper()
+            needs[ticker] = min(needs.get(ticker, start), start)
+        return self
+
+    def windows(self):
+        merged = {}
+        for needs in self._needs.values():
+            for ticker, start in needs.items():
+                merged[ticker] = min(merged.get(ticker, start), start)
+        return merged
+
+    def requests(self):
+        # One range request per distinct start date, batching every ticker that shares it
+        groups = defaultdict(list)
+        for ticker, start in self.windows().items():
+            groups[start].append(ticker)
+        return sorted(groups.items())
+
+    def fetch(self, priority=CARD):
+        for start, tickers in self.requests():
+            self.frames.update(fetch_watchlist(tickers, start, self.end, self.interval, priority))
+        return self
+
+    def peek(self, priority=CARD):
+        # Stale-while-revalidate counterpart of fetch(): never waits on the network
+        for start, tickers in self.requests():
+            frames, as_of, stale = peek_watchlist(tickers, start, self.end, self.interval)
+            self.frames.update(frames)
+            self.as_of.update(as_of)
+            self.stale += stale
+            prefetch_watchlist(stale, start, self.end, self.interval, priority=priority)
+        return self
+
+    def fill(self, consumer=None, priority=CARD):
+        # After peek(): waits only on tickers with nothing in memory or on disk yet,
+        # optionally only those one consumer needs
+        wanted = self._needs[consumer] if consumer is not None else None
+        for start, tickers in self.requests():
+            cold = [t for t in tickers if t not in self.frames and (wanted is None or t in wanted)]
+            if cold:
+                self.frames.update(fetch_watchlist(cold, start, self.end, self.interval, priority))
+        return self
+
+    def frames_for(self, consumer):
+        out = {}
+        for ticker, start in self._needs[consumer].items():
+            df = self.frames.get(ticker)
+            if df is not None:
+                out[ticker] = df.loc[df.index >= start]
+        return out
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from request_scheduler import DETAIL, CircuitOpenError, RetryableError, scheduler
+
+BASE_URL = "https://finnhub.io/api/v1"
+DEFAULT_TIMEOUT = 5
+POOL_SIZE = 8
+RESPONSE_TTL = 300
+
+NEWS_DAYS = 7
+NEWS_LIMIT = 5
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _result(future):
+    try:
+        return future.result()
+    except (RetryableError, CircuitOpenError, requests.RequestException):
+        return None
+
+
+def _details(news, rec, limit):
+    items = _result(news)
+    rec = _result(rec)
+    return {
+        "news": None if items is None else items[:limit],
+        "recommendation": rec[0] if rec else None,
+    }
+
+
+class FinnhubClient:
+    def __init__(self, api_key, timeout=DEFAULT_TIMEOUT, ttl=RESPONSE_TTL, priority=DETAIL):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.ttl = ttl
+        self.priority = priority
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self._responses = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _request(self, path, params):
+        try:
+            resp = self.session.get(
+                f"{BASE_URL}/{path}",
+                params={**params, "token": self.api_key},
+                timeout=self.timeout,
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableError(str(e))
+        if resp.status_code == 429 or resp.status_code >= 500:
+            retry_after = resp.headers.get("Retry-After")
+            raise RetryableError(
+                f"finnhub {resp.status_code}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        if resp.status_code != 200:
+            return None
+        try:
+            return resp.json()
+        except ValueError:
+            return None
+
+    def submit_json(self, path, **params):
+        key = (path, tuple(sorted(params.items())))
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached and cached[0] > time.monotonic():
+                return _done(cached[1])
+            # Reruns polling for a slow response share the request already queued
+            if key in self._pending:
+                return self._pending[key]
+            try:
+                future = scheduler.submit("finnhub", self._request, path, params, priority=self.priority)
+            except queue.Full:
+                return _done(None)
+            self._pending[key] = future
+        future.add_done_callback(lambda f: self._remember(key, f))
+        return future
+
+    def _remember(self, key, future):
+        data = _result(future)
+        with self._lock:
+            self._pending.pop(key, None)
+            if data is not None:
+                self._responses[key] = (time.monotonic() + self.ttl, data)
+
+    def submit_news(self, ticker, days=NEWS_DAYS):
+        to_date = datetime.today()
+        from_date = to_date - timedelta(days=days)
+        return self.submit_json(
+            "company-news",
+            symbol=ticker,
+            **{"from": from_date.strftime("%Y-%m-%d"), "to": to_date.strftime("%Y-%m-%d")},
+        )
+
+    def submit_recommendation(self, ticker):
+        return self.submit_json("stock/recommendation", symbol=ticker)
+
+    def _submit_details(self, tickers):
+        # Queue both endpoints for every ticker up front instead of 2 x N serial calls;
+        # the shared scheduler runs them concurrently within the Finnhub quota.
+        tickers = list(dict.fromkeys(tickers))
+        return {t: (self.submit_news(t), self.submit_recommendation(t)) for t in tickers}
+
+    def fetch_details(self, tickers, limit=NEWS_LIMIT):
+        return {t: _details(*futures, limit) for t, futures in self._submit_details(tickers).items()}
+
+    def peek_details(self, tickers, limit=NEWS_LIMIT):
+        # Never waits: tickers whose responses are still in flight map to None and
+        # fill in on a later rerun
+        return {
+            t: _details(*futures, limit) if all(f.done() for f in futures) else None
+            for t, futures in self._submit_details(tickers).items()
+        }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = FinnhubClient(api_key)
+        return _clients[api_key]
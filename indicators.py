@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+SMA_WINDOW = 15
+BAND_PCT = 0.05
+
+ABOVE = 1
+NEUTRAL = 0
+BELOW = -1
+
+
+def price_matrix(frames, column="Close"):
+    series = {ticker: df[column] for ticker, df in frames.items() if column in df.columns and not df.empty}
+    if not series:
+        return pd.DataFrame()
+    return pd.DataFrame(series).sort_index()
+
+
+def rolling_mean(values, window):
+    # Each column's mean over its own last `window` valid rows, so a ticker is not
+    # held back by dates only other tickers traded on; NaN on rows with no price
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    rows, cols = np.nonzero(valid)
+    # Running sum after the k-th valid value of each column
+    by_count = np.zeros((values.shape[0] + 1, values.shape[1]))
+    by_count[counts[rows, cols], cols] = sums[rows, cols]
+    out = np.full(values.shape, np.nan)
+    full = counts[rows, cols] >= window
+    rows, cols = rows[full], cols[full]
+    k = counts[rows, cols]
+    out[rows, cols] = (by_count[k, cols] - by_count[k - window, cols]) / window
+    return out
+
+
+def last_valid_rows(values):
+    # Per row, the latest row at or before it holding a price, -1 before the first
+    positions = np.where(~np.isnan(values), np.arange(values.shape[0])[:, None], -1)
+    return np.maximum.accumulate(positions, axis=0)
+
+
+class BandMatrix:
+    def __init__(self, prices, window=SMA_WINDOW, pct=BAND_PCT):
+        self.window = window
+        self.pct = pct
+        self.index = prices.index
+        self.tickers = list(prices.columns)
+
+        close = prices.to_numpy(dtype=float)
+        sma = rolling_mean(close, window)
+        self.close = close
+        self.sma = sma
+        self.upper = sma * (1 + pct)
+        self.lower = sma * (1 - pct)
+        self.latest = self._latest()
+
+    def _latest(self):
+        cols = np.arange(len(self.tickers))
+        valid_rows = last_valid_rows(self.close)
+        last = valid_rows[-1] if len(valid_rows) else np.full(len(cols), -1)
+        rows = np.maximum(last, 0)
+        # The previous close is the column's own prior bar, not the row above
+        prev_rows = valid_rows[np.maximum(rows - 1, 0), cols] if len(valid_rows) else rows
+        prev_rows = np.where(prev_rows >= 0, prev_rows, rows)
+
+        current = self.close[rows, cols]
+        previous = self.close[prev_rows, cols]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(previous != 0, (current - previous) / previous * 100, 0.0)
+
+        upper = self.upper[rows, cols]
+        lower = self.lower[rows, cols]
+        state = np.where(current > upper, ABOVE, np.where(current < lower, BELOW, NEUTRAL))
+
+        latest = pd.DataFrame(
+            {
+                "current": current,
+                "previous": previous,
+                "change": change,
+                "sma": self.sma[rows, cols],
+                "upper": upper,
+                "lower": lower,
+                "state": state,
+                "as_of": self.index[rows] if len(self.index) else pd.NaT,
+            },
+            index=self.tickers,
+        )
+        return latest[last >= 0]
+
+    def breaches(self):
+        latest = self.latest
+        return latest[latest["state"] != NEUTRAL]
+
+    def frame(self, ticker):
+        col = self.tickers.index(ticker)
+        df = pd.DataFrame(
+            {
+                "Adj Close": self.close[:, col],
+                f"SMA{self.window}": self.sma[:, col],
+                "Upper": self.upper[:, col],
+                "Lower": self.lower[:, col],
+            },
+            index=self.index,
+        )
+        return df[~np.isnan(self.close[:, col])]
+
+
+def compute_bands(frames, window=SMA_WINDOW, pct=BAND_PCT):
+    return BandMatrix(price_matrix(frames), window=window, pct=pct)
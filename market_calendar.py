@@ -0,0 +1,152 @@
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+NY_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+EARLY_CLOSE = dtime(13, 0)
+# Daily bars are final a little after the close; one more refresh picks them up
+SETTLE = timedelta(minutes=15)
+# Give the first bars of a session a moment to show up upstream
+OPEN_DELAY = timedelta(minutes=1)
+
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    first = date(year, month, 1)
+    day = first + timedelta(days=(weekday - first.weekday()) % 7)
+    return day + timedelta(weeks=n - 1)
+
+
+def _last_weekday(year, month, weekday):
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    # NYSE full-day closures
+    days = {
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _last_weekday(year, 5, 0),  # Memorial Day
+        _observed(date(year, 7, 4)),  # Independence Day
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # New Year's Day on a Saturday is not made up on the previous Friday
+    if date(year, 1, 1).weekday() != 5:
+        days.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(days)
+
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    days = {
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # Day after Thanksgiving
+        date(year, 12, 24),
+    }
+    july_3 = date(year, 7, 3)
+    if date(year, 7, 4).weekday() in (1, 2, 3, 4):
+        days.add(july_3)
+    return frozenset(d for d in days if d.weekday() < 5 and d not in holidays(year))
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session_hours(day):
+    # (open, close) as New York datetimes, or None when the exchange is closed
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else MARKET_CLOSE
+    return (
+        datetime.combine(day, MARKET_OPEN, tzinfo=NY_TZ),
+        datetime.combine(day, close, tzinfo=NY_TZ),
+    )
+
+
+def session_start(sessions, now=None):
+    # Date of the `sessions`-th most recent trading day up to `now`
+    day = ny_now(now).date()
+    while True:
+        if is_trading_day(day):
+            sessions -= 1
+            if sessions <= 0:
+                return day
+        day -= timedelta(days=1)
+
+
+def ny_now(now=None):
+    return (now or datetime.now(NY_TZ)).astimezone(NY_TZ)
+
+
+def is_open(now=None):
+    now = ny_now(now)
+    hours = session_hours(now.date())
+    return hours is not None and hours[0] <= now < hours[1]
+
+
+def last_close(now=None):
+    now = ny_now(now)
+    day = now.date()
+    while True:
+        hours = session_hours(day)
+        if hours is not None and hours[1] <= now:
+            return hours[1]
+        day -= timedelta(days=1)
+
+
+def next_open(now=None):
+    now = ny_now(now)
+    day = now.date()
+    while True:
+        hours = session_hours(day)
+        if hours is not None and hours[0] > now:
+            return hours[0]
+        day += timedelta(days=1)
+
+
+def next_refresh(now=None, cadence=60):
+    # When new bars can next exist: every `cadence` seconds during a session,
+    # once more after the close to pick up the final bar, then the next open
+    now = ny_now(now)
+    if is_open(now):
+        return now + timedelta(seconds=cadence)
+    settled = last_close(now) + SETTLE
+    if now < settled:
+        return settled
+    return next_open(now) + OPEN_DELAY
+
+
+def market_status(now=None):
+    return "open" if is_open(now) else "closed"
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bulk_fetch import fetch_watchlist
+from market_calendar import market_status, next_refresh, ny_now
+from request_scheduler import PREFETCH
+
+DEFAULT_TICKERS = ["TSLA", "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA"]
+DEFAULT_CADENCE = int(os.getenv("REFRESH_CADENCE", "60"))
+LOOKBACK_DAYS = 365
+# A session that has not rerun for this long no longer counts towards the union
+SESSION_IDLE = 15 * 60
+
+log = logging.getLogger("market_refresh")
+
+
+class ActiveWatchlists:
+    # Watchlists of the Streamlit sessions seen recently, so one batch can
+    # refresh every ticker any open page is looking at
+    def __init__(self, idle=SESSION_IDLE):
+        self.idle = idle
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def touch(self, session_id, tickers):
+        with self._lock:
+            self._sessions[session_id] = (list(tickers), time.monotonic())
+
+    def union(self):
+        cutoff = time.monotonic() - self.idle
+        with self._lock:
+            for session_id in [s for s, (_, seen) in self._sessions.items() if seen < cutoff]:
+                del self._sessions[session_id]
+            tickers = [t for tickers, _ in self._sessions.values() for t in tickers]
+        return list(dict.fromkeys(tickers))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+active_watchlists = ActiveWatchlists()
+
+
+class MarketRefresher:
+    # Keeps the shared cache warm on the exchange's schedule: once at startup,
+    # every `cadence` seconds while the market is open, once after the close,
+    # and nothing at all overnight, on weekends and on holidays.
+    def __init__(self, tickers_fn, cadence=DEFAULT_CADENCE, lookback_days=LOOKBACK_DAYS):
+        self.tickers_fn = tickers_fn
+        self.cadence = cadence
+        self.lookback_days = lookback_days
+        self.last_refresh = None
+        self.next_due = None
+        self.refreshes = 0
+        self.tickers = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        tickers = self.tickers_fn() or DEFAULT_TICKERS
+        self.tickers = len(tickers)
+        end = datetime.today()
+        # Fresh cache entries are served locally, so this only goes upstream for expired ones
+        frames = fetch_watchlist(tickers, end - timedelta(days=self.lookback_days), end, priority=PREFETCH)
+        self.last_refresh = ny_now()
+        self.refreshes += 1
+        return frames
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                log.exception("market refresh failed")
+            self.next_due = next_refresh(cadence=self.cadence)
+            if self._stop.wait((self.next_due - ny_now()).total_seconds()):
+                break
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="market-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self):
+        return {
+            "market": market_status(),
+            "last_refresh": self.last_refresh.isoformat(timespec="seconds") if self.last_refresh else None,
+            "next_refresh": self.next_due.isoformat(timespec="seconds") if self.next_due else None,
+            "refreshes": self.refreshes,
+            "tickers": self.tickers,
+            "active_sessions": len(active_watchlists),
+        }
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_refresher(tickers_fn=active_watchlists.union, cadence=DEFAULT_CADENCE):
+    # One refresher per process; the first caller's watchlist source and cadence win
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = MarketRefresher(tickers_fn, cadence).start()
+        return _refresher
@@ -0,0 +1,218 @@
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+from alert_store import DEFAULT_DB
+
+PUSHBULLET_URL = "https://api.pushbullet.com/v2/pushes"
+REQUEST_TIMEOUT = 10
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 600.0
+POLL_INTERVAL = 1.0
+# A row stuck in "sending" this long belongs to a process that died mid-send
+STALE_CLAIM = 120.0
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    sent_at TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+def recipient_key(token):
+    # Rows are scoped to the token that queued them; only a hash is stored
+    return hashlib.sha256((token or "").encode()).hexdigest()[:16]
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def post_pushbullet_note(title, body, token, session=None, url=PUSHBULLET_URL, timeout=REQUEST_TIMEOUT):
+    data = {"type": "note", "title": title, "body": body}
+    return (session or requests).post(
+        url,
+        json=data,
+        headers={"Access-Token": token, "Content-Type": "application/json"},
+        timeout=timeout,
+    )
+
+
+class PushOutbox:
+    # Persistent queue of Pushbullet notes. enqueue() only writes a row; a
+    # background thread delivers with retries, so callers never wait on the network.
+    def __init__(self, token, path=DEFAULT_DB, url=PUSHBULLET_URL, timeout=REQUEST_TIMEOUT,
+                 max_attempts=MAX_ATTEMPTS):
+        self.token = token
+        self.recipient = recipient_key(token)
+        self.path = Path(path)
+        self.url = url
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.session = requests.Session()
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            # Outboxes created before rows were scoped to a token
+            if "recipient" not in {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}:
+                conn.execute("ALTER TABLE outbox ADD COLUMN recipient TEXT NOT NULL DEFAULT ''")
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_recipient_due ON outbox (recipient, status, next_attempt_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, title, body):
+        with self._conn() as conn:
+            message_id = self.insert(conn, title, body)
+        self.wake()
+        return message_id
+
+    def insert(self, conn, title, body):
+        # Writes the row on the caller's connection so it commits or rolls back
+        # together with the caller's own changes; call wake() after the commit
+        return conn.execute(
+            "INSERT INTO outbox (recipient, title, body, status, next_attempt_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.recipient, title, body, PENDING, time.time(), utc_now()),
+        ).lastrowid
+
+    def wake(self):
+        self._wake.set()
+
+    def status(self, message_id):
+        row = self._conn().execute(
+            "SELECT status, attempts, last_error, sent_at FROM outbox WHERE id = ?", (message_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("status", "attempts", "last_error", "sent_at"), row))
+
+    def counts(self):
+        return dict(self._conn().execute(
+            "SELECT status, COUNT(*) FROM outbox WHERE recipient = ? GROUP BY status", (self.recipient,)
+        ))
+
+    def _claim(self):
+        # While a row is "sending", next_attempt_at holds the claim time. Only rows
+        # queued under this outbox's token are ever sent with it.
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT id, title, body, attempts, status, next_attempt_at FROM outbox WHERE recipient = ? "
+                "AND ((status = ? AND next_attempt_at <= ?) OR (status = ? AND next_attempt_at <= ?)) "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (self.recipient, PENDING, now, SENDING, now - STALE_CLAIM),
+            ).fetchone()
+            if row is None:
+                return None
+            cur = conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ? WHERE id = ? AND status = ? AND next_attempt_at = ?",
+                (SENDING, now, row[0], row[4], row[5]),
+            )
+            # Another process claimed it first
+            return row[:4] if cur.rowcount else None
+
+    def _deliver(self, message_id, title, body, attempts):
+        error = None
+        permanent = False
+        try:
+            resp = post_pushbullet_note(title, body, self.token, self.session, self.url, self.timeout)
+            if resp.status_code == 200:
+                with self._conn() as conn:
+                    conn.execute(
+                        "UPDATE outbox SET status = ?, attempts = ?, last_error = NULL, sent_at = ? WHERE id = ?",
+                        (SENT, attempts + 1, utc_now(), message_id),
+                    )
+                return True
+            error = f"HTTP {resp.status_code}"
+            # Bad token or malformed note will not fix itself; throttling and 5xx might
+            permanent = 400 <= resp.status_code < 500 and resp.status_code != 429
+        except requests.RequestException as e:
+            error = str(e)
+
+        attempts += 1
+        if permanent or attempts >= self.max_attempts:
+            status, next_at = FAILED, time.time()
+        else:
+            delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempts - 1))
+            status, next_at = PENDING, time.time() + random.uniform(delay / 2, delay)
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                (status, attempts, error, next_at, message_id),
+            )
+        return False
+
+    def drain_once(self):
+        delivered = 0
+        while not self._stop.is_set():
+            row = self._claim()
+            if row is None:
+                break
+            delivered += self._deliver(*row)
+        return delivered
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.drain_once()
+            except sqlite3.Error:
+                # Database busy with another process; retry on the next poll
+                pass
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="push-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_outboxes = {}
+_outboxes_lock = threading.Lock()
+
+
+def get_outbox(token):
+    with _outboxes_lock:
+        if token not in _outboxes:
+            _outboxes[token] = PushOutbox(token).start()
+        return _outboxes[token]
@@ -0,0 +1,72 @@
+import html
+
+import numpy as np
+
+from indicators import ABOVE, BELOW
+
+SPARK_POINTS = 40
+SPARK_BARS = 60
+SPARK_WIDTH = 120
+SPARK_HEIGHT = 28
+
+BADGES = {
+    ABOVE: ("▲ above", "#1a7f37"),
+    BELOW: ("▼ below", "#cf222e"),
+}
+
+STYLE = """
+<style>
+.ov-grid {display:grid;grid-template-columns:repeat(auto-fill,minmax(170px,1fr));gap:6px;}
+.ov-cell {border:1px solid rgba(128,128,128,.25);border-radius:6px;padding:4px 6px;font-size:12px;line-height:1.3;}
+.ov-head {display:flex;justify-content:space-between;font-weight:600;}
+.ov-badge {font-size:10px;padding:0 4px;border-radius:3px;color:white;}
+.ov-cell svg {display:block;}
+</style>
+"""
+
+
+def spark_paths(close, points=SPARK_POINTS, width=SPARK_WIDTH, height=SPARK_HEIGHT):
+    # Scales the trailing window of every ticker at once; one points string per column
+    if close.shape[0] == 0:
+        return [""] * close.shape[1]
+    rows = np.unique(np.linspace(0, close.shape[0] - 1, min(points, close.shape[0])).astype(int))
+    window = close[rows]
+    lo = np.nanmin(np.where(np.isnan(window), np.inf, window), axis=0)
+    hi = np.nanmax(np.where(np.isnan(window), -np.inf, window), axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    ys = np.rint((height - 1) - (window - lo) / span * (height - 2)).astype(float)
+    xs = np.rint(np.linspace(0, width - 1, len(rows))).astype(int)
+
+    paths = []
+    for col in range(close.shape[1]):
+        y = ys[:, col]
+        valid = ~np.isnan(y)
+        paths.append(" ".join(f"{x},{int(v)}" for x, v in zip(xs[valid], y[valid])))
+    return paths
+
+
+def overview_html(bands, tickers, bars=SPARK_BARS):
+    known = [t for t in tickers if t in bands.latest.index]
+    cols = [bands.tickers.index(t) for t in known]
+    paths = spark_paths(bands.close[-bars:, cols]) if cols else []
+    latest = bands.latest
+
+    cells = []
+    for ticker, path in zip(known, paths):
+        row = latest.loc[ticker]
+        color = "#1a7f37" if row["change"] >= 0 else "#cf222e"
+        badge = ""
+        if row["state"] in BADGES:
+            label, bg = BADGES[row["state"]]
+            badge = f"<span class='ov-badge' style='background:{bg}'>{label}</span>"
+        cells.append(
+            f"<div class='ov-cell'>"
+            f"<div class='ov-head'><span>{html.escape(ticker)}</span>{badge}</div>"
+            f"<div>${row['current']:.2f} <span style='color:{color}'>{row['change']:+.2f}%</span></div>"
+            f"<svg width='{SPARK_WIDTH}' height='{SPARK_HEIGHT}'>"
+            f"<polyline fill='none' stroke='{color}' stroke-width='1.2' points='{path}'/></svg>"
+            f"</div>"
+        )
+    missing = [t for t in tickers if t not in bands.latest.index]
+    footer = f"<div style='font-size:12px;opacity:.7'>No data: {html.escape(', '.join(missing))}</div>" if missing else ""
+    return STYLE + "<div class='ov-grid'>" + "".join(cells) + "</div>" + footer
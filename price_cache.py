@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from market_calendar import is_open, next_refresh, ny_now
+
+# Short TTL while the market is open, otherwise hold until new bars can exist
+INTRADAY_TTL = 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Re-probe a symbol that came back empty after 1 min, 2 min, 4 min, ... up to 6 h
+NEGATIVE_BASE = 60
+NEGATIVE_CAP = 6 * 60 * 60
+
+
+def market_ttl(now=None):
+    now = ny_now(now)
+    if is_open(now):
+        return INTRADAY_TTL
+    return max(INTRADAY_TTL, (next_refresh(now) - now).total_seconds())
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class HistoryCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl_fn=market_ttl):
+        self.max_bytes = max_bytes
+        self.ttl_fn = ttl_fn
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                # Expired entries stay around for peek() until they are replaced or evicted
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, key):
+        # Freshness check that does not count towards the hit/miss stats
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def peek(self, key):
+        # Stale-while-revalidate read: (frame, stored_at, fresh) even past the TTL,
+        # without touching the LRU order or the stats
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None, False
+            return entry[0], entry[3], entry[1] > time.monotonic()
+
+    def put(self, key, df):
+        nbytes = frame_nbytes(df)
+        if nbytes > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl_fn()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (df, expires, nbytes, datetime.now())
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _drop(self, key):
+        nbytes = self._entries.pop(key)[2]
+        self._bytes -= nbytes
+
+
+class NegativeCache:
+    # (symbol, interval) pairs that returned no data or errored; skipped until their
+    # re-probe time. A fund without intraday bars still serves its daily history.
+    def __init__(self, base=NEGATIVE_BASE, cap=NEGATIVE_CAP):
+        self.base = base
+        self.cap = cap
+        self.skipped = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def blocked(self, ticker, interval="1d"):
+        with self._lock:
+            entry = self._entries.get((ticker, interval))
+            if entry is None or entry[1] <= time.monotonic():
+                return False
+            self.skipped += 1
+            return True
+
+    def retry_in(self, ticker, interval="1d"):
+        with self._lock:
+            entry = self._entries.get((ticker, interval))
+            return max(0.0, entry[1] - time.monotonic()) if entry else 0.0
+
+    def failure(self, ticker, interval="1d"):
+        with self._lock:
+            failures = self._entries.get((ticker, interval), (0, 0))[0] + 1
+            delay = min(self.cap, self.base * 2 ** (failures - 1))
+            self._entries[(ticker, interval)] = (failures, time.monotonic() + delay)
+
+    def success(self, ticker, interval="1d"):
+        with self._lock:
+            self._entries.pop((ticker, interval), None)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "blocked": sum(1 for _, until in self._entries.values() if until > now),
+                "skipped": self.skipped,
+            }
+
+
+# Process-wide caches shared by every Streamlit session
+history_cache = HistoryCache()
+negative_cache = NegativeCache()
+
+
+def cache_key(ticker, start, end, interval="1d"):
+    return (
+        ticker.strip().upper(),
+        pd.Timestamp(start).date().isoformat(),
+        pd.Timestamp(end).date().isoformat(),
+        interval,
+    )
@@ -0,0 +1,331 @@
+import itertools
+import queue
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+# Lower value runs first
+ALERT = 0
+CARD = 1
+DETAIL = 2
+PREFETCH = 3
+PRIORITY_NAMES = {ALERT: "alert", CARD: "card", DETAIL: "detail", PREFETCH: "prefetch"}
+
+DEFAULT_MAX_QUEUE = 500
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+# Error budget per upstream: more than this share of failed calls within the
+# window (and at least BUDGET_MIN_CALLS calls) opens the circuit
+ERROR_BUDGET = 0.5
+BUDGET_WINDOW = 60.0
+BUDGET_MIN_CALLS = 10
+CIRCUIT_COOLDOWN = 30.0
+CIRCUIT_COOLDOWN_CAP = 600.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# (requests per second, burst size, worker threads)
+UPSTREAM_LIMITS = {
+    "finnhub": (1.0, 30, 8),
+    "yfinance": (2.0, 5, 2),
+}
+
+
+class RetryableError(Exception):
+    def __init__(self, message="", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    # Open: calls fail immediately. After the cooldown one probe is let through
+    # (half-open); success closes the circuit, failure reopens it for twice as long.
+    def __init__(self, budget=ERROR_BUDGET, window=BUDGET_WINDOW, min_calls=BUDGET_MIN_CALLS,
+                 cooldown=CIRCUIT_COOLDOWN, cooldown_cap=CIRCUIT_COOLDOWN_CAP):
+        self.budget = budget
+        self.window = window
+        self.min_calls = min_calls
+        self.base_cooldown = cooldown
+        self.cooldown_cap = cooldown_cap
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.trips = 0
+        self._outcomes = deque()
+        self._failures = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        with self._lock:
+            return self.state == OPEN and time.monotonic() < self.open_until
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.open_until:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, ok):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if ok:
+                    self._close()
+                else:
+                    self._open(now, min(self.cooldown_cap, self.cooldown * 2))
+                return
+            if self.state == OPEN:
+                return
+            self._outcomes.append((now, ok))
+            self._failures += not ok
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._failures -= not self._outcomes.popleft()[1]
+            total = len(self._outcomes)
+            if total >= self.min_calls and self._failures / total > self.budget:
+                self._open(now, self.base_cooldown)
+
+    def error_rate(self):
+        with self._lock:
+            return self._failures / len(self._outcomes) if self._outcomes else 0.0
+
+    def _open(self, now, cooldown):
+        self.state = OPEN
+        self.cooldown = cooldown
+        self.open_until = now + cooldown
+        self.trips += 1
+        self._probing = False
+
+    def _close(self):
+        self.state = CLOSED
+        self.cooldown = self.base_cooldown
+        self._outcomes.clear()
+        self._failures = 0
+        self._probing = False
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        # Drain the bucket so nothing is sent upstream for roughly `seconds`
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+
+def backoff_delay(attempt, retry_after=None, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    if retry_after:
+        return retry_after + random.uniform(0, base)
+    # Full jitter keeps concurrent retries from hitting upstream in lockstep
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class _Upstream:
+    def __init__(self, name, bucket, workers, max_queue):
+        self.name = name
+        self.bucket = bucket
+        self.workers = workers
+        self.queue = queue.PriorityQueue(maxsize=max_queue)
+        self.depth = Counter()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.breaker = CircuitBreaker()
+        # First attempts not yet taken by a worker: future -> (priority, job)
+        self.waiting = {}
+
+
+class RequestScheduler:
+    def __init__(self, limits=UPSTREAM_LIMITS, max_queue=DEFAULT_MAX_QUEUE, max_retries=MAX_RETRIES):
+        self.max_retries = max_retries
+        self._seq = itertools.count()
+        self._upstreams = {
+            name: _Upstream(name, TokenBucket(rate, burst), workers, max_queue)
+            for name, (rate, burst, workers) in limits.items()
+        }
+
+    def submit(self, upstream, fn, *args, priority=CARD, **kwargs):
+        up = self._upstreams[upstream]
+        self._ensure_workers(up)
+        future = Future()
+        if up.breaker.is_open():
+            # Fail fast instead of queueing behind an upstream that is down
+            with up.lock:
+                up.stats["short_circuited"] += 1
+            future.set_exception(CircuitOpenError(f"{upstream} circuit is open"))
+            return future
+        job = (fn, args, kwargs, future, 0)
+        with up.lock:
+            up.waiting[future] = (priority, job)
+        try:
+            self._enqueue(up, priority, job)
+        except queue.Full:
+            with up.lock:
+                up.waiting.pop(future, None)
+            raise
+        return future
+
+    def promote(self, upstream, future, priority):
+        # Queues a waiting job again at a more urgent priority; whichever copy a
+        # worker takes first runs it and the other is dropped
+        up = self._upstreams[upstream]
+        with up.lock:
+            queued = up.waiting.get(future)
+            if queued is None or queued[0] <= priority:
+                return False
+            up.waiting[future] = (priority, queued[1])
+            up.stats["promoted"] += 1
+        try:
+            self._enqueue(up, priority, queued[1])
+        except queue.Full:
+            return False
+        return True
+
+    def call(self, upstream, fn, *args, priority=CARD, **kwargs):
+        return self.submit(upstream, fn, *args, priority=priority, **kwargs).result()
+
+    def circuit_open(self, upstream):
+        return self._upstreams[upstream].breaker.is_open()
+
+    def metrics(self):
+        out = {}
+        for name, up in self._upstreams.items():
+            with up.lock:
+                out[name] = {
+                    "queue_depth": sum(up.depth.values()),
+                    "queued": {PRIORITY_NAMES.get(p, p): n for p, n in up.depth.items() if n},
+                    "completed": up.stats["completed"],
+                    "failed": up.stats["failed"],
+                    "retries": up.stats["retries"],
+                    "rejected": up.stats["rejected"],
+                    "short_circuited": up.stats["short_circuited"],
+                    "promoted": up.stats["promoted"],
+                    "tokens": round(up.bucket.available(), 2),
+                    "circuit": up.breaker.state,
+                    "error_rate": round(up.breaker.error_rate(), 2),
+                    "circuit_trips": up.breaker.trips,
+                }
+        return out
+
+    def _enqueue(self, up, priority, job):
+        with up.lock:
+            up.depth[priority] += 1
+        try:
+            up.queue.put_nowait((priority, next(self._seq), job))
+        except queue.Full:
+            with up.lock:
+                up.depth[priority] -= 1
+                up.stats["rejected"] += 1
+            raise
+
+    def _ensure_workers(self, up):
+        with up.lock:
+            if up.threads:
+                return
+            for i in range(up.workers):
+                thread = threading.Thread(target=self._work, args=(up,), name=f"{up.name}-{i}", daemon=True)
+                thread.start()
+                up.threads.append(thread)
+
+    def _work(self, up):
+        while True:
+            priority, _, job = up.queue.get()
+            with up.lock:
+                up.depth[priority] -= 1
+            fn, args, kwargs, future, attempt = job
+            if attempt == 0:
+                with up.lock:
+                    if up.waiting.pop(future, None) is None:
+                        # The other copy of a promoted job already ran
+                        continue
+                if not future.set_running_or_notify_cancel():
+                    continue
+            if not up.breaker.allow():
+                with up.lock:
+                    up.stats["short_circuited"] += 1
+                future.set_exception(CircuitOpenError(f"{up.name} circuit is open"))
+                continue
+            up.bucket.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except RetryableError as e:
+                up.breaker.record(False)
+                if attempt < self.max_retries:
+                    self._retry(up, priority, (fn, args, kwargs, future, attempt + 1), e.retry_after)
+                    continue
+                self._fail(up, future, e)
+            except Exception as e:
+                up.breaker.record(False)
+                self._fail(up, future, e)
+            else:
+                up.breaker.record(True)
+                with up.lock:
+                    up.stats["completed"] += 1
+                future.set_result(result)
+
+    def _retry(self, up, priority, job, retry_after):
+        delay = backoff_delay(job[4], retry_after)
+        if retry_after:
+            up.bucket.pause(retry_after)
+        with up.lock:
+            up.stats["retries"] += 1
+
+        def requeue():
+            try:
+                self._enqueue(up, priority, job)
+            except queue.Full as e:
+                self._fail(up, job[3], e)
+
+        timer = threading.Timer(delay, requeue)
+        timer.daemon = True
+        timer.start()
+
+    def _fail(self, up, future, exc):
+        with up.lock:
+            up.stats["failed"] += 1
+        future.set_exception(exc)
+
+
+scheduler = RequestScheduler()
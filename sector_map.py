@@ -0,0 +1,268 @@
+"""Sector/industry metadata and the market-cap treemap built from it.
+
+Load the S&P 500 universe offline with ``python sector_map.py refresh``.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import yfinance as yf
+
+from charts import cached_figure
+from request_scheduler import PREFETCH, scheduler
+
+DEFAULT_DB = Path(os.getenv("METADATA_DB", Path(__file__).parent / "data" / "metadata.sqlite3"))
+SP500_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+# Shares outstanding barely move; sector and industry even less
+METADATA_TTL = 7 * 24 * 60 * 60
+UNKNOWN = "Unknown"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbol_meta (
+    ticker TEXT PRIMARY KEY,
+    name TEXT,
+    sector TEXT,
+    industry TEXT,
+    shares REAL,
+    market_cap REAL,
+    universe TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS symbol_meta_universe ON symbol_meta (universe);
+"""
+COLUMNS = ["name", "sector", "industry", "shares", "market_cap", "universe", "updated_at"]
+
+
+class MetadataStore:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def frame(self, tickers):
+        rows = self._conn().execute(
+            f"SELECT ticker, {', '.join(COLUMNS)} FROM symbol_meta "
+            f"WHERE ticker IN ({', '.join('?' * len(tickers))})",
+            list(tickers),
+        ).fetchall()
+        df = pd.DataFrame(rows, columns=["ticker"] + COLUMNS).set_index("ticker")
+        return df.reindex(list(tickers))
+
+    def universe(self, name):
+        rows = self._conn().execute(
+            "SELECT ticker FROM symbol_meta WHERE universe = ? ORDER BY ticker", (name,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def stale(self, tickers, ttl=METADATA_TTL):
+        df = self.frame(tickers)
+        old = df["updated_at"].isna() | (df["updated_at"] < time.time() - ttl)
+        return df.index[old].tolist()
+
+    def set_classification(self, rows, universe):
+        # Index listings are authoritative for sector and industry
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT INTO symbol_meta (ticker, name, sector, industry, universe) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(ticker) DO UPDATE SET name = excluded.name, sector = excluded.sector, "
+                "industry = excluded.industry, universe = excluded.universe",
+                [(r["ticker"], r["name"], r["sector"], r["industry"], universe) for r in rows],
+            )
+
+    def set_fundamentals(self, ticker, info):
+        # Classification from quote data only fills gaps so naming stays consistent
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO symbol_meta (ticker, name, sector, industry, shares, market_cap, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(ticker) DO UPDATE SET name = COALESCE(symbol_meta.name, excluded.name), "
+                "sector = COALESCE(symbol_meta.sector, excluded.sector), "
+                "industry = COALESCE(symbol_meta.industry, excluded.industry), "
+                "shares = excluded.shares, market_cap = excluded.market_cap, updated_at = excluded.updated_at",
+                (ticker, info.get("shortName"), info.get("sector"), info.get("industry"),
+                 info.get("sharesOutstanding"), info.get("marketCap"), time.time()),
+            )
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def default_store(path=DEFAULT_DB):
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = MetadataStore(path)
+        return _stores[path]
+
+
+def _info(ticker):
+    return yf.Ticker(ticker).info or {}
+
+
+_filling = set()
+_filling_lock = threading.Lock()
+
+
+def fill_metadata(tickers, store, priority=PREFETCH):
+    # Missing or stale rows are refreshed in the background; the treemap
+    # renders with what is there and picks the rest up on a later run
+    with _filling_lock:
+        pending = [t for t in store.stale(tickers) if t not in _filling]
+        _filling.update(pending)
+    if not pending:
+        return None
+
+    def run():
+        futures = {}
+        for ticker in pending:
+            try:
+                futures[ticker] = scheduler.submit("yfinance", _info, ticker, priority=priority)
+            except Exception:
+                continue
+        try:
+            for ticker, future in futures.items():
+                try:
+                    store.set_fundamentals(ticker, future.result())
+                except Exception:
+                    continue
+        finally:
+            with _filling_lock:
+                _filling.difference_update(pending)
+
+    thread = threading.Thread(target=run, name="metadata-fill", daemon=True)
+    thread.start()
+    return thread
+
+
+class Hierarchy:
+    # Sector -> industry -> ticker, laid out once as flat ids/parents arrays.
+    # Per-run work is only the bincount roll-up of caps and returns.
+    def __init__(self, tickers, sectors, industries):
+        sectors = np.asarray(sectors, dtype=object)
+        industries = np.asarray(industries, dtype=object)
+        sector_codes, sector_names = pd.factorize(sectors)
+        industry_keys = sectors + " / " + industries
+        industry_codes, industry_names = pd.factorize(industry_keys)
+        first = np.unique(industry_codes, return_index=True)[1]
+
+        self.leaf_industry = industry_codes
+        self.industry_sector = sector_codes[first]
+        self.n_sectors = len(sector_names)
+        self.n_industries = len(industry_names)
+
+        sector_ids = np.array(["s:" + s for s in sector_names], dtype=object)
+        industry_ids = np.array(["i:" + k for k in industry_names], dtype=object)
+        self.ids = np.concatenate([sector_ids, industry_ids, np.array(["t:" + t for t in tickers], dtype=object)])
+        self.labels = np.concatenate([sector_names, industries[first], np.asarray(tickers, dtype=object)])
+        self.parents = np.concatenate([
+            np.full(self.n_sectors, "", dtype=object),
+            sector_ids[self.industry_sector],
+            industry_ids[industry_codes],
+        ])
+
+    def roll_up(self, caps, returns):
+        # Node sizes sum their children; node colours are cap-weighted returns
+        industry_cap = np.bincount(self.leaf_industry, caps, self.n_industries)
+        sector_cap = np.bincount(self.industry_sector, industry_cap, self.n_sectors)
+        industry_ret = np.bincount(self.leaf_industry, caps * returns, self.n_industries) / industry_cap
+        sector_ret = np.bincount(self.industry_sector, industry_cap * industry_ret, self.n_sectors) / sector_cap
+        return (
+            np.concatenate([sector_cap, industry_cap, caps]),
+            np.concatenate([sector_ret, industry_ret, returns]),
+        )
+
+
+_hierarchies = {}
+_hierarchies_lock = threading.Lock()
+
+
+def get_hierarchy(key, tickers, sectors, industries):
+    with _hierarchies_lock:
+        if key not in _hierarchies:
+            if len(_hierarchies) >= 16:
+                _hierarchies.pop(next(iter(_hierarchies)))
+            _hierarchies[key] = Hierarchy(tickers, sectors, industries)
+        return _hierarchies[key]
+
+
+def treemap_figure(hierarchy, caps, returns, prices, height=650):
+    values, colors = hierarchy.roll_up(caps, returns)
+    n_nodes = hierarchy.n_sectors + hierarchy.n_industries
+    price_text = np.concatenate([np.full(n_nodes, ""), np.char.mod("$%.2f", prices)])
+    fig = go.Figure(go.Treemap(
+        ids=hierarchy.ids,
+        labels=hierarchy.labels,
+        parents=hierarchy.parents,
+        values=values,
+        branchvalues="total",
+        customdata=np.column_stack([colors, price_text]),
+        marker=dict(colors=colors, colorscale="RdYlGn", cmid=0, showscale=True),
+        texttemplate="%{label}<br>%{customdata[0]:+.2f}%",
+        hovertemplate="%{label}<br>Return %{customdata[0]:+.2f}%<br>%{customdata[1]}<extra></extra>",
+    ))
+    fig.update_layout(height=height, margin=dict(l=0, r=0, t=30, b=0))
+    return fig
+
+
+def sector_treemap(bands, store, tickers=None):
+    tickers = [t for t in (tickers or bands.latest.index) if t in bands.latest.index]
+    if not tickers:
+        return None
+    meta = store.frame(tickers)
+    latest = bands.latest.loc[tickers]
+    prices = latest["current"].to_numpy(dtype=float)
+    returns = latest["change"].to_numpy(dtype=float)
+
+    # Cap from today's price where shares are known, else the last quoted cap
+    caps = np.where(meta["shares"].notna(), meta["shares"].to_numpy(dtype=float) * prices,
+                    meta["market_cap"].to_numpy(dtype=float))
+    known = np.isfinite(caps) & (caps > 0)
+    caps = np.where(known, caps, np.median(caps[known]) if known.any() else 1.0)
+
+    sectors = meta["sector"].fillna(UNKNOWN).tolist()
+    industries = meta["industry"].fillna(UNKNOWN).tolist()
+    layout = hash((tuple(tickers), tuple(sectors), tuple(industries)))
+    hierarchy = get_hierarchy(layout, tickers, sectors, industries)
+    key = ("sector-treemap", layout, bands.index[-1], hash(prices.tobytes()), hash(caps.tobytes()))
+    return cached_figure(key, lambda: treemap_figure(hierarchy, caps, returns, prices))
+
+
+def refresh_sp500(store=None):
+    store = store or default_store()
+    table = pd.read_html(SP500_URL, attrs={"id": "constituents"})[0]
+    rows = [
+        {
+            "ticker": str(r["Symbol"]).strip().upper().replace(".", "-"),
+            "name": r["Security"],
+            "sector": r["GICS Sector"],
+            "industry": r["GICS Sub-Industry"],
+        }
+        for _, r in table.iterrows()
+    ]
+    store.set_classification(rows, "sp500")
+    thread = fill_metadata([r["ticker"] for r in rows], store)
+    if thread is not None:
+        thread.join()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["refresh"]:
+        sys.exit("usage: python sector_map.py refresh")
+    print(f"loaded {refresh_sp500()} S&P 500 constituents into {DEFAULT_DB}")
@@ -1,9 +1,9 @@
 
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import altair as alt
 from datetime import datetime, timedelta
+from bulk_fetch import fetch_watchlist
+from charts import cached_line_spec
 
 st.set_page_config(layout="wide")
 st.title("Stock Portfolio Dashboard - Full View")
@@ -32,17 +32,19 @@ for i, tkr in enumerate(st.session_state.tickers):
 # 날짜 설정
 end = datetime.today()
 start = end - timedelta(days=60)
+frames = fetch_watchlist(st.session_state.tickers, start, end)
 
 # 종목 카드 반복
 cols = st.columns(3)
 for i, ticker in enumerate(st.session_state.tickers):
     with cols[i % 3]:
         try:
-            df = yf.download(ticker, start=start, end=end, progress=False, threads=True)
-            if df.empty or "Adj Close" not in df.columns:
+            df = frames.get(ticker, pd.DataFrame())
+            if df.empty or "Close" not in df.columns:
                 st.error(f"{ticker} has no data.")
                 continue
 
+            df["Adj Close"] = df["Close"]
             df["SMA15"] = df["Adj Close"].rolling(window=15).mean()
             df["Upper"] = df["SMA15"] * 1.05
             df["Lower"] = df["SMA15"] * 0.95
@@ -53,18 +55,12 @@ for i, ticker in enumerate(st.session_state.tickers):
 
             st.metric(label=f"{ticker}", value=f"${current_price:.2f}", delta=f"{delta:.2f}%")
 
-            chart_data = df[["Adj Close", "SMA15", "Upper", "Lower"]].dropna().reset_index().melt('Date')
-            if chart_data.empty:
+            spec = cached_line_spec(ticker, df, height=150)
+            if spec is None:
                 st.warning(f"Insufficient data for {ticker}'s chart.")
                 continue
 
-            line_chart = alt.Chart(chart_data).mark_line().encode(
-                x=alt.X('Date:T', title=None),
-                y=alt.Y('value:Q', title=None),
-                color=alt.Color('variable:N', title="Legend")
-            ).properties(height=150)
-
-            st.altair_chart(line_chart, use_container_width=True)
+            st.vega_lite_chart(spec, use_container_width=True)
 
             with st.expander(f"Details for {ticker}"):
                 st.markdown("##### Latest News (sample headlines)")
@@ -1,9 +1,9 @@
 
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import altair as alt
 from datetime import datetime, timedelta
+from bulk_fetch import fetch_watchlist
 
 st.set_page_config(layout="wide")
 st.title("📊 Smart Stock Dashboard (Final Stable Version)")
@@ -32,13 +32,14 @@ for i, tk in enumerate(st.session_state.tickers):
 # 기간 설정
 end = datetime.today()
 start = end - timedelta(days=60)
+frames = fetch_watchlist(st.session_state.tickers, start, end)
 cols = st.columns(3)
 
 # 종목 반복
 for i, ticker in enumerate(st.session_state.tickers):
     with cols[i % 3]:
         try:
-            df = yf.Ticker(ticker).history(start=start, end=end)
+            df = frames.get(ticker, pd.DataFrame())
             if df.empty or "Close" not in df.columns:
                 st.error(f"{ticker}: No valid data.")
                 continue
@@ -1,10 +1,10 @@
 
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import requests
+from bulk_fetch import fetch_watchlist
+from charts import cached_card_figure
+from finnhub_client import get_client
+from indicators import compute_bands
 
 st.set_page_config(layout="wide")
 st.title("📊 Smart Stock Dashboard (Final Stable Version)")
@@ -28,33 +28,27 @@ if top[1].button("Add") and new_ticker:
 # 기간 설정
 end = datetime.today()
 start = end - timedelta(days=365)
+frames = fetch_watchlist(st.session_state.tickers, start, end)
+bands = compute_bands(frames)
+details = get_client(FINNHUB_API_KEY).fetch_details(st.session_state.tickers)
 
 # 종목 카드 반복
 cols = st.columns(3)
 for i, ticker in enumerate(st.session_state.tickers):
     with cols[i % 3]:
         try:
-            df = yf.Ticker(ticker).history(start=start, end=end)
-            if df.empty or "Close" not in df.columns:
+            if ticker not in bands.latest.index:
                 st.error(f"{ticker}: No valid data.")
                 continue
 
-            df["Adj Close"] = df["Close"]
-            df["SMA15"] = df["Adj Close"].rolling(window=15).mean()
-            df["Upper"] = df["SMA15"] * 1.05
-            df["Lower"] = df["SMA15"] * 0.95
-            current = df["Adj Close"].iloc[-1]
-            previous = df["Adj Close"].iloc[-2] if len(df) >= 2 else current
-            change = ((current - previous) / previous * 100) if previous != 0 else 0
+            df = bands.frame(ticker)
+            latest = bands.latest.loc[ticker]
+            current = latest["current"]
+            change = latest["change"]
 
             st.metric(label=f"{ticker}", value=f"${current:.2f}", delta=f"{change:.2f}%")
 
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df.index, y=df["Adj Close"], name="Adj Close"))
-            fig.add_trace(go.Scatter(x=df.index, y=df["SMA15"], name="SMA15"))
-            fig.add_trace(go.Scatter(x=df.index, y=df["Upper"], name="Upper", line=dict(dash="dot")))
-            fig.add_trace(go.Scatter(x=df.index, y=df["Lower"], name="Lower", line=dict(dash="dot")))
-            fig.update_layout(height=250, margin=dict(l=10, r=10, t=20, b=10), showlegend=True)
+            fig = cached_card_figure(ticker, df)
             st.plotly_chart(fig, use_container_width=True)
 
             # 삭제 버튼 우상단 배치
@@ -66,12 +60,8 @@ for i, ticker in enumerate(st.session_state.tickers):
             with st.expander(f"Details for {ticker}"):
                 # 뉴스 API 요청
                 st.markdown("**Latest News Headlines**")
-                from_date = (datetime.today() - timedelta(days=7)).strftime('%Y-%m-%d')
-                to_date = datetime.today().strftime('%Y-%m-%d')
-                news_url = f"https://finnhub.io/api/v1/company-news?symbol={ticker}&from={from_date}&to={to_date}&token={FINNHUB_API_KEY}"
-                news_resp = requests.get(news_url)
-                if news_resp.status_code == 200:
-                    news_items = news_resp.json()[:5]
+                news_items = details[ticker]["news"]
+                if news_items is not None:
                     if news_items:
                         for article in news_items:
                             st.markdown(f"- [{article['headline']}]({article['url']})")
@@ -82,16 +72,14 @@ for i, ticker in enumerate(st.session_state.tickers):
 
                 # 애널리스트 의견
                 st.markdown("**Analyst Recommendations**")
-                rec_url = f"https://finnhub.io/api/v1/stock/recommendation?symbol={ticker}&token={FINNHUB_API_KEY}"
-                rec_resp = requests.get(rec_url)
-                if rec_resp.status_code == 200 and rec_resp.json():
-                    latest = rec_resp.json()[0]
+                rec = details[ticker]["recommendation"]
+                if rec:
                     st.write({
-                        "Strong Buy": latest.get("strongBuy", "N/A"),
-                        "Buy": latest.get("buy", "N/A"),
-                        "Hold": latest.get("hold", "N/A"),
-                        "Sell": latest.get("sell", "N/A"),
-                        "Strong Sell": latest.get("strongSell", "N/A")
+                        "Strong Buy": rec.get("strongBuy", "N/A"),
+                        "Buy": rec.get("buy", "N/A"),
+                        "Hold": rec.get("hold", "N/A"),
+                        "Sell": rec.get("sell", "N/A"),
+                        "Strong Sell": rec.get("strongSell", "N/A")
                     })
                 else:
                     st.info("No analyst recommendation data found.")
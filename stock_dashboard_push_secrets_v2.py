@@ -1,10 +1,11 @@
 
 import streamlit as st
-import yfinance as yf
-import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import requests
+from bulk_fetch import fetch_watchlist
+from finnhub_client import get_client
+from indicators import ABOVE, BELOW, compute_bands
+from alert_digest import get_coalescer
 
 st.set_page_config(layout="wide")
 st.title("📊 Smart Stock Dashboard (Cloud Secure)")
@@ -13,14 +14,8 @@ st.title("📊 Smart Stock Dashboard (Cloud Secure)")
 FINNHUB_API_KEY = st.secrets["FINNHUB_API_KEY"]
 PUSHBULLET_TOKEN = st.secrets["PUSHBULLET_TOKEN"]
 
-def send_pushbullet_notification(title, body, token):
-    data = {"type": "note", "title": title, "body": body}
-    resp = requests.post(
-        "https://api.pushbullet.com/v2/pushes",
-        json=data,
-        headers={"Access-Token": token, "Content-Type": "application/json"}
-    )
-    return resp.status_code == 200
+# Breaches are deduplicated across sessions and sent as digests in the background
+alert_digest = get_coalescer(PUSHBULLET_TOKEN)
 
 # Show last updated time
 now = datetime.now().strftime("⏱ Last update: %Y-%m-%d %H:%M")
@@ -39,36 +34,28 @@ if top[1].button("Add") and new_ticker:
 
 end = datetime.today()
 start = end - timedelta(days=365)
+frames = fetch_watchlist(st.session_state.tickers, start, end)
+bands = compute_bands(frames)
+# News and recommendations for every card are queued at once on the shared client
+details = get_client(FINNHUB_API_KEY).fetch_details(st.session_state.tickers)
 
 cols = st.columns(3)
 for i, ticker in enumerate(st.session_state.tickers):
     with cols[i % 3]:
         try:
-            df = yf.Ticker(ticker).history(start=start, end=end)
-            if df.empty or "Close" not in df.columns:
+            if ticker not in bands.latest.index:
                 st.error(f"⚠️ {ticker}: No valid data.")
                 continue
 
-            df["Adj Close"] = df["Close"]
-            df["SMA15"] = df["Adj Close"].rolling(window=15).mean()
-            df["Upper"] = df["SMA15"] * 1.05
-            df["Lower"] = df["SMA15"] * 0.95
-            current = df["Adj Close"].iloc[-1]
-            previous = df["Adj Close"].iloc[-2] if len(df) >= 2 else current
-            change = ((current - previous) / previous * 100) if previous != 0 else 0
-
-            if current > df["Upper"].iloc[-1]:
-                send_pushbullet_notification(
-                    f"{ticker} Alert: Above Upper Limit",
-                    f"{ticker} price ${current:.2f} > upper ${df['Upper'].iloc[-1]:.2f}",
-                    PUSHBULLET_TOKEN
-                )
-            elif current < df["Lower"].iloc[-1]:
-                send_pushbullet_notification(
-                    f"{ticker} Alert: Below Lower Limit",
-                    f"{ticker} price ${current:.2f} < lower ${df['Lower'].iloc[-1]:.2f}",
-                    PUSHBULLET_TOKEN
-                )
+            df = bands.frame(ticker)
+            latest = bands.latest.loc[ticker]
+            current = latest["current"]
+            change = latest["change"]
+
+            if latest["state"] == ABOVE:
+                alert_digest.submit(ticker, "above", current, latest["upper"])
+            elif latest["state"] == BELOW:
+                alert_digest.submit(ticker, "below", current, latest["lower"])
 
             st.metric(label=f"{ticker}", value=f"${current:.2f}", delta=f"{change:.2f}%")
 
@@ -96,12 +83,8 @@ for i, ticker in enumerate(st.session_state.tickers):
 
             with st.expander(f"Details for {ticker}"):
                 st.markdown("**Latest News Headlines**")
-                from_date = (datetime.today() - timedelta(days=7)).strftime('%Y-%m-%d')
-                to_date = datetime.today().strftime('%Y-%m-%d')
-                news_url = f"https://finnhub.io/api/v1/company-news?symbol={ticker}&from={from_date}&to={to_date}&token={FINNHUB_API_KEY}"
-                news_resp = requests.get(news_url)
-                if news_resp.status_code == 200:
-                    news_items = news_resp.json()[:5]
+                news_items = details[ticker]["news"]
+                if news_items is not None:
                     if news_items:
                         for article in news_items:
                             st.markdown(f"- [{article['headline']}]({article['url']})")
@@ -111,16 +94,14 @@ for i, ticker in enumerate(st.session_state.tickers):
                     st.warning("News service unavailable.")
 
                 st.markdown("**Analyst Recommendations**")
-                rec_url = f"https://finnhub.io/api/v1/stock/recommendation?symbol={ticker}&token={FINNHUB_API_KEY}"
-                rec_resp = requests.get(rec_url)
-                if rec_resp.status_code == 200 and rec_resp.json():
-                    latest = rec_resp.json()[0]
+                rec = details[ticker]["recommendation"]
+                if rec:
                     st.write({
-                        "Strong Buy": latest.get("strongBuy", "N/A"),
-                        "Buy": latest.get("buy", "N/A"),
-                        "Hold": latest.get("hold", "N/A"),
-                        "Sell": latest.get("sell", "N/A"),
-                        "Strong Sell": latest.get("strongSell", "N/A")
+                        "Strong Buy": rec.get("strongBuy", "N/A"),
+                        "Buy": rec.get("buy", "N/A"),
+                        "Hold": rec.get("hold", "N/A"),
+                        "Sell": rec.get("sell", "N/A"),
+                        "Strong Sell": rec.get("strongSell", "N/A")
                     })
                 else:
                     st.info("No analyst recommendation data found.")
@@ -1,139 +1,345 @@
 
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import requests
+import uuid
+from alert_store import default_store
+from bulk_fetch import in_flight, peek_watchlist, prefetch_watchlist, refreshing
+from charts import cached_card_figure, figure_cache
+from fetch_planner import FetchPlan
+from finnhub_client import get_client
+from indicators import SMA_WINDOW, compute_bands
+from market_refresh import active_watchlists, get_refresher
+from overview import SPARK_BARS, overview_html
+from price_cache import history_cache, negative_cache
+from request_scheduler import CARD, scheduler
+from streaming_indicators import indicator_registry
+from symbol_index import get_index, parse_symbols, prober, symbols_from_csv
+from timeframes import DEFAULT_TIMEFRAME, TIMEFRAMES, timeframe_bands
 
 st.set_page_config(layout="wide")
 st.title("📊 Smart Stock Dashboard (Cloud Secure)")
 
 # Load secrets
 FINNHUB_API_KEY = st.secrets["FINNHUB_API_KEY"]
-PUSHBULLET_TOKEN = st.secrets["PUSHBULLET_TOKEN"]
 
-def send_pushbullet_notification(title, body, token):
-    data = {"type": "note", "title": title, "body": body}
-    resp = requests.post(
-        "https://api.pushbullet.com/v2/pushes",
-        json=data,
-        headers={"Access-Token": token, "Content-Type": "application/json"}
-    )
-    return resp.status_code == 200
+# Push alerts are sent by alert_worker.py; the page only reads the shared state
+alert_store = default_store()
+
+# Warms the union of every open session's watchlist on the exchange calendar,
+# so concurrent page loads find the cache already filled
+refresher = get_refresher()
 
 now = datetime.now().strftime("⏱ Last update: %Y-%m-%d %H:%M")
 st.caption(now)
+status = refresher.status()
+if refresher.next_due:
+    st.sidebar.caption(f"Market {status['market']} · next data refresh {refresher.next_due:%a %H:%M} ET")
+
+with st.sidebar.expander("Data layer stats"):
+    st.write({
+        "history_cache": history_cache.stats(),
+        "single_flight": in_flight.stats(),
+        "negative_cache": negative_cache.stats(),
+        "figure_cache": figure_cache.stats(),
+        "upstreams": scheduler.metrics(),
+        "alert_worker_last_run": alert_store.get_meta("worker_last_run", "never"),
+        "market_refresh": status,
+    })
+
+PAGE_SIZE = 9
+REFRESH_OPTIONS = {"Off": None, "15 s": 15, "1 min": 60, "5 min": 300}
+# How often the grid checks for background refreshes that have landed
+REVALIDATE_POLL = 2
 
 if "tickers" not in st.session_state:
     st.session_state.tickers = ["TSLA", "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA"]
-if "alerts_sent" not in st.session_state:
-    st.session_state.alerts_sent = {}
+if "cards_shown" not in st.session_state:
+    st.session_state.cards_shown = PAGE_SIZE
+if "revalidating" not in st.session_state:
+    st.session_state.revalidating = True
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "probing" not in st.session_state:
+    # Symbols the listing does not carry, waiting on an upstream check
+    st.session_state.probing = []
+    st.session_state.rejected = []
+# Tickers added since the last full run; they render apart from the grid
+st.session_state.added = []
+
 
-st.subheader("🔍 Add a Stock")
-top = st.columns([5, 1])
-new_ticker = top[0].text_input("Enter a stock ticker", label_visibility="collapsed")
-if top[1].button("Add") and new_ticker:
-    ticker = new_ticker.strip().upper()
-    if ticker and ticker not in st.session_state.tickers:
-        st.session_state.tickers.append(ticker)
+def touch_session():
+    # The worker alerts on this session's tickers; the refresher keeps them warm
+    alert_store.touch_watchlist(st.session_state.session_id, st.session_state.tickers)
+    active_watchlists.touch(st.session_state.session_id, st.session_state.tickers)
+
+
+touch_session()
 
 end = datetime.today()
 start = end - timedelta(days=365)
+live_refresh = REFRESH_OPTIONS[st.sidebar.selectbox("Live price refresh", list(REFRESH_OPTIONS))]
 
-cols = st.columns(3)
-for i, ticker in enumerate(st.session_state.tickers):
-    with cols[i % 3]:
-        try:
-            df = yf.Ticker(ticker).history(start=start, end=end)
-            if df.empty or "Close" not in df.columns:
-                st.error(f"⚠️ {ticker}: No valid data.")
-                continue
-
-            df["Adj Close"] = df["Close"]
-            df["SMA15"] = df["Adj Close"].rolling(window=15).mean()
-            df["Upper"] = df["SMA15"] * 1.05
-            df["Lower"] = df["SMA15"] * 0.95
-            current = df["Adj Close"].iloc[-1]
-            previous = df["Adj Close"].iloc[-2] if len(df) >= 2 else current
-            change = ((current - previous) / previous * 100) if previous != 0 else 0
-
-            # Alert state tracking
-            upper = df["Upper"].iloc[-1]
-            lower = df["Lower"].iloc[-1]
-            prev_state = st.session_state.alerts_sent.get(ticker, "neutral")
-
-            if current > upper and prev_state != "above":
-                send_pushbullet_notification(
-                    f"{ticker} Alert: Above Upper Limit",
-                    f"{ticker} price ${current:.2f} > upper ${upper:.2f}",
-                    PUSHBULLET_TOKEN
-                )
-                st.session_state.alerts_sent[ticker] = "above"
-            elif current < lower and prev_state != "below":
-                send_pushbullet_notification(
-                    f"{ticker} Alert: Below Lower Limit",
-                    f"{ticker} price ${current:.2f} < lower ${lower:.2f}",
-                    PUSHBULLET_TOKEN
-                )
-                st.session_state.alerts_sent[ticker] = "below"
-            elif lower <= current <= upper:
-                st.session_state.alerts_sent[ticker] = "neutral"
-
-            st.metric(label=f"{ticker}", value=f"${current:.2f}", delta=f"{change:.2f}%")
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df.index, y=df["Adj Close"], name="Adj Close"))
-            fig.add_trace(go.Scatter(x=df.index, y=df["SMA15"], name="SMA15"))
-            fig.add_trace(go.Scatter(x=df.index, y=df["Upper"], name="Upper", line=dict(dash="dot")))
-            fig.add_trace(go.Scatter(x=df.index, y=df["Lower"], name="Lower", line=dict(dash="dot")))
-            fig.update_layout(height=250, margin=dict(l=10, r=10, t=20, b=10), showlegend=True)
-
-            st.plotly_chart(fig, use_container_width=True)
-
-            st.markdown(
-                f"<div style='text-align:right;'>"
-                f"<form action='' method='post'>"
-                f"<button name='remove_{ticker}' type='submit' style='background-color:#ff4b4b;color:white;border:none;padding:2px 6px;border-radius:4px;font-size:12px;'>Remove</button>"
-                f"</form></div>",
-                unsafe_allow_html=True,
-            )
-
-            if st.session_state.get(f"remove_{ticker}"):
-                st.session_state.tickers.remove(ticker)
-                st.session_state.alerts_sent.pop(ticker, None)
-                st.experimental_rerun()
-
-            with st.expander(f"Details for {ticker}"):
-                st.markdown("**Latest News Headlines**")
-                from_date = (datetime.today() - timedelta(days=7)).strftime('%Y-%m-%d')
-                to_date = datetime.today().strftime('%Y-%m-%d')
-                news_url = f"https://finnhub.io/api/v1/company-news?symbol={ticker}&from={from_date}&to={to_date}&token={FINNHUB_API_KEY}"
-                news_resp = requests.get(news_url)
-                if news_resp.status_code == 200:
-                    news_items = news_resp.json()[:5]
-                    if news_items:
-                        for article in news_items:
-                            st.markdown(f"- [{article['headline']}]({article['url']})")
+
+def add_tickers(tickers):
+    new = [t for t in tickers if t not in st.session_state.tickers]
+    if new:
+        st.session_state.tickers.extend(new)
+        st.session_state.added.extend(new)
+        touch_session()
+    return new
+
+
+def validate_symbols(symbols):
+    # The local symbol index answers for listed symbols right away; anything it
+    # does not carry is probed upstream in the background and added once it
+    # checks out, so the callback never waits on the network
+    known, unknown = get_index().validate(symbols)
+    unknown = [s for s in unknown if s not in st.session_state.tickers]
+    prober.submit(unknown)
+    st.session_state.probing = list(dict.fromkeys(st.session_state.probing + unknown))
+    st.session_state.rejected = []
+    return known
+
+
+def resolve_probes():
+    waiting = []
+    for symbol in st.session_state.probing:
+        found = prober.result(symbol)
+        if found is None:
+            waiting.append(symbol)
+        elif found:
+            add_tickers([symbol])
+        else:
+            st.session_state.rejected.append(symbol)
+    st.session_state.probing = waiting
+
+
+def add_ticker(ticker=None):
+    add_tickers(validate_symbols([ticker or st.session_state.new_ticker]))
+    st.session_state.new_ticker = ""
+
+
+def bulk_add():
+    symbols = parse_symbols(st.session_state.bulk_text)
+    if st.session_state.bulk_csv is not None:
+        symbols += symbols_from_csv(st.session_state.bulk_csv.getvalue())
+    st.session_state.bulk_result = len(add_tickers(validate_symbols(symbols)))
+    st.session_state.bulk_text = ""
+
+
+def remove_ticker(ticker):
+    if ticker in st.session_state.tickers:
+        st.session_state.tickers.remove(ticker)
+    indicator_registry.drop(ticker)
+    touch_session()
+
+
+def show_more_cards():
+    st.session_state.cards_shown += PAGE_SIZE
+
+
+def card_metric(ticker):
+    # Reads whatever is cached, so a live refresh never waits on the network;
+    # an expired entry is refreshed in the background and shows up next tick
+    frames, _, stale = peek_watchlist([ticker], start, datetime.today())
+    prefetch_watchlist(stale, start, datetime.today(), priority=CARD)
+    df = frames.get(ticker)
+    if df is None or df.empty:
+        return
+    current = df["Close"].iloc[-1]
+    previous = df["Close"].iloc[-2] if len(df) >= 2 else current
+    change = ((current - previous) / previous * 100) if previous != 0 else 0
+    st.metric(label=f"{ticker}", value=f"${current:.2f}", delta=f"{change:.2f}%")
+
+
+@st.fragment
+def card(ticker, df, alert_state, details, as_of, updating):
+    # Each card is its own fragment: removing it reruns only this card, which
+    # then renders nothing
+    if ticker not in st.session_state.tickers:
+        return
+
+    st.fragment(card_metric, run_every=live_refresh)(ticker)
+    marker = f"Data as of {as_of:%Y-%m-%d %H:%M}" if as_of else f"Data through {df.index[-1]:%Y-%m-%d}"
+    st.caption(marker + (" · refreshing…" if updating else ""))
+    if alert_state != "neutral":
+        st.caption(f"🔔 Alert: {alert_state} the ±5% band")
+
+    stream = indicator_registry.sync(ticker, df["Adj Close"])
+    if stream.get("rsi") is not None and stream.get("bollinger") is not None:
+        macd, signal, _ = stream["macd"]
+        _, bb_upper, bb_lower = stream["bollinger"]
+        st.caption(
+            f"RSI14 {stream['rsi']:.1f} · EMA20 ${stream['ema20']:.2f} · "
+            f"MACD {macd:.2f}/{signal:.2f} · BB20 ${bb_lower:.2f}–${bb_upper:.2f}"
+        )
+
+    # Switching range reruns only this card; other ranges are resampled from cached base series
+    timeframe = st.segmented_control(
+        "Range", list(TIMEFRAMES), default=DEFAULT_TIMEFRAME, key=f"range_{ticker}", label_visibility="collapsed"
+    ) or DEFAULT_TIMEFRAME
+    if timeframe == DEFAULT_TIMEFRAME:
+        fig = cached_card_figure(ticker, df)
+    else:
+        chart_df = timeframe_bands(ticker, timeframe)
+        fig = cached_card_figure(f"{ticker}:{timeframe}", chart_df) if chart_df is not None else None
+
+    loading = bool(refreshing([ticker], interval=None))
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, key=f"chart_{ticker}")
+    elif loading:
+        st.info(f"⏳ {ticker}: loading {timeframe}…")
+    else:
+        st.info(f"No {timeframe} data for {ticker}.")
+    if loading and not st.session_state.revalidating:
+        # A range switch started a refresh; the grid polls until it lands
+        st.session_state.revalidating = True
+        st.rerun()
+
+    st.button("Remove", key=f"remove_{ticker}", on_click=remove_ticker, args=(ticker,))
+
+    with st.expander(f"Details for {ticker}"):
+        if details is None:
+            st.caption("Loading news and recommendations…")
+            return
+        st.markdown("**Latest News Headlines**")
+        news_items = details["news"]
+        if news_items is not None:
+            if news_items:
+                for article in news_items:
+                    st.markdown(f"- [{article['headline']}]({article['url']})")
+            else:
+                st.info("No recent headlines found.")
+        else:
+            st.warning("News service unavailable.")
+
+        st.markdown("**Analyst Recommendations**")
+        rec = details["recommendation"]
+        if rec:
+            st.write({
+                "Strong Buy": rec.get("strongBuy", "N/A"),
+                "Buy": rec.get("buy", "N/A"),
+                "Hold": rec.get("hold", "N/A"),
+                "Sell": rec.get("sell", "N/A"),
+                "Strong Sell": rec.get("strongSell", "N/A")
+            })
+        else:
+            st.info("No analyst recommendation data found.")
+
+
+def paint_cards(card_tickers, plan):
+    # Returns whether anything painted is still loading
+    bands = compute_bands(plan.frames_for("cards"))
+    updating = set(refreshing(card_tickers))
+    alert_states = alert_store.states()
+
+    # News and recommendations fill in behind the first paint
+    details = get_client(FINNHUB_API_KEY).peek_details(card_tickers)
+    loading_details = any(d is None for d in details.values())
+
+    cols = st.columns(3)
+    for i, ticker in enumerate(card_tickers):
+        with cols[i % 3]:
+            try:
+                if ticker not in bands.latest.index:
+                    if ticker in updating:
+                        st.info(f"⏳ {ticker}: loading…")
                     else:
-                        st.info("No recent headlines found.")
-                else:
-                    st.warning("News service unavailable.")
-
-                st.markdown("**Analyst Recommendations**")
-                rec_url = f"https://finnhub.io/api/v1/stock/recommendation?symbol={ticker}&token={FINNHUB_API_KEY}"
-                rec_resp = requests.get(rec_url)
-                if rec_resp.status_code == 200 and rec_resp.json():
-                    latest = rec_resp.json()[0]
-                    st.write({
-                        "Strong Buy": latest.get("strongBuy", "N/A"),
-                        "Buy": latest.get("buy", "N/A"),
-                        "Hold": latest.get("hold", "N/A"),
-                        "Sell": latest.get("sell", "N/A"),
-                        "Strong Sell": latest.get("strongSell", "N/A")
-                    })
-                else:
-                    st.info("No analyst recommendation data found.")
-
-        except Exception as e:
-            st.error(f"{ticker}: error - {e}")
+                        retry = negative_cache.retry_in(ticker)
+                        st.error(f"⚠️ {ticker}: No valid data." + (f" Retrying in {retry / 60:.0f} min." if retry else ""))
+                    continue
+                card(
+                    ticker, bands.frame(ticker), alert_states.get(ticker, "neutral"), details[ticker],
+                    plan.as_of.get(ticker), ticker in updating,
+                )
+            except Exception as e:
+                st.error(f"{ticker}: error - {e}")
+    # Other ranges refresh in the background too
+    return bool(refreshing(card_tickers, interval=None)) or loading_details
+
+
+def new_cards():
+    # Cards added since the last full run, so Add paints only these; the next
+    # full run folds them into the grid. Symbols still being checked upstream
+    # land here too once they pass.
+    resolve_probes()
+    if st.session_state.probing:
+        st.caption(f"Checking {', '.join(st.session_state.probing[:20])} upstream…")
+    rejected = st.session_state.rejected
+    if len(rejected) == 1:
+        st.error(f"Unknown symbol: {rejected[0]}")
+    elif rejected:
+        st.warning(f"{len(rejected)} unknown: {', '.join(rejected[:50])}" + (" …" if len(rejected) > 50 else ""))
+    added = [t for t in st.session_state.added if t in st.session_state.tickers]
+    if not added:
+        return
+    st.subheader("🆕 Just added")
+    plan = FetchPlan(end)
+    plan.need("cards", added, days=365).peek()
+    paint_cards(added, plan)
+
+
+def add_section():
+    # Typing, adding and bulk adding rerun only this section
+    st.subheader("🔍 Add a Stock")
+    symbols = get_index()
+    top = st.columns([5, 1])
+    top[0].text_input("Enter a stock ticker", key="new_ticker", label_visibility="collapsed")
+    top[1].button("Add", on_click=add_ticker)
+    query = st.session_state.get("new_ticker", "")
+    matches = [m for m in symbols.prefix(query) if m not in st.session_state.tickers]
+    for col, match in zip(st.columns(len(matches)) if matches else [], matches):
+        col.button(match, key=f"suggest_{match}", help=symbols.name(match), on_click=add_ticker, args=(match,))
+    with st.expander("Bulk add"):
+        st.text_area("Paste symbols (comma, space or newline separated)", key="bulk_text")
+        st.file_uploader("…or upload a CSV with a Symbol/Ticker column", type="csv", key="bulk_csv")
+        st.button("Add all", on_click=bulk_add)
+        if st.session_state.get("bulk_result") is not None:
+            st.caption(f"Added {st.session_state.bulk_result} listed symbols.")
+
+    # New cards and pending checks poll on their own until the grid takes them over
+    polling = st.session_state.added or st.session_state.probing
+    st.fragment(new_cards, run_every=REVALIDATE_POLL if polling else None)()
+
+
+def watchlist():
+    # Loading more or revalidating reruns only this section; unchanged cards
+    # are served from the history, figure and Finnhub caches
+    shown = [t for t in st.session_state.tickers if t not in st.session_state.added]
+
+    # Paint from the last known data (memory or disk) and revalidate in the background.
+    # Each view states the history it needs; the plan fetches every ticker once.
+    view = st.radio("View", ["Cards", "Overview"], horizontal=True, label_visibility="collapsed")
+    plan = FetchPlan(end)
+    if view == "Overview":
+        # Sparklines and badges need a few months; only opened cards need the full year
+        plan.need("overview", shown, sessions=SPARK_BARS + SMA_WINDOW - 1)
+        card_tickers = [t for t in st.session_state.get("open_cards", []) if t in shown]
+    else:
+        card_tickers = shown[:st.session_state.cards_shown]
+    plan.need("cards", card_tickers, days=365).peek()
+
+    if view == "Overview":
+        overview = compute_bands(plan.frames_for("overview"))
+        st.markdown(overview_html(overview, shown), unsafe_allow_html=True)
+        st.multiselect("Open full cards", shown, key="open_cards")
+    else:
+        # Only the visible page is refreshed first; the rest warms behind it
+        prefetch_watchlist(shown[st.session_state.cards_shown:], start, end)
+    busy = paint_cards(card_tickers, plan)
+    if view == "Overview":
+        # The overview repaints once its own tickers finish revalidating too
+        busy = busy or bool(refreshing(shown))
+
+    remaining = len(shown) - len(card_tickers)
+    if view == "Cards" and remaining > 0:
+        st.button(f"Load more ({remaining} more)", on_click=show_more_cards)
+
+    # Poll only while a refresh is in flight; switching the cadence needs a full run
+    if st.session_state.revalidating != busy:
+        st.session_state.revalidating = busy
+        st.rerun()
+
+
+st.fragment(add_section)()
+st.fragment(watchlist, run_every=REVALIDATE_POLL if st.session_state.revalidating else None)()
@@ -1,9 +1,9 @@
 
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import altair as alt
 from datetime import datetime, timedelta
+from bulk_fetch import fetch_watchlist
+from charts import cached_line_spec
 
 st.set_page_config(layout="wide")
 st.title("📊 Smart Stock Dashboard")
@@ -32,18 +32,20 @@ for i, tk in enumerate(st.session_state.tickers):
 # 기간 설정
 end = datetime.today()
 start = end - timedelta(days=60)
+frames = fetch_watchlist(st.session_state.tickers, start, end)
 cols = st.columns(3)
 
 # 종목 반복
 for i, ticker in enumerate(st.session_state.tickers):
     with cols[i % 3]:
         try:
-            df = yf.download(ticker, start=start, end=end, progress=False, threads=False)
-            if df.empty or "Adj Close" not in df.columns:
+            df = frames.get(ticker, pd.DataFrame())
+            if df.empty or "Close" not in df.columns:
                 st.error(f"{ticker}: No valid data.")
                 continue
 
             # 계산
+            df["Adj Close"] = df["Close"]
             df["SMA15"] = df["Adj Close"].rolling(window=15).mean()
             df["Upper"] = df["SMA15"] * 1.05
             df["Lower"] = df["SMA15"] * 0.95
@@ -55,17 +57,12 @@ for i, ticker in enumerate(st.session_state.tickers):
             st.metric(label=f"{ticker}", value=f"${current:.2f}", delta=f"{change:.2f}%")
 
             # 차트
-            chart_df = df[["Adj Close", "SMA15", "Upper", "Lower"]].dropna().reset_index().melt("Date")
-            if chart_df.empty:
+            spec = cached_line_spec(ticker, df, height=160)
+            if spec is None:
                 st.warning("No chart data.")
                 continue
 
-            chart = alt.Chart(chart_df).mark_line().encode(
-                x=alt.X("Date:T", title=None),
-                y=alt.Y("value:Q", title=None),
-                color=alt.Color("variable:N", title="Legend")
-            ).properties(height=160)
-            st.altair_chart(chart, use_container_width=True)
+            st.vega_lite_chart(spec, use_container_width=True)
 
             # 상세정보 확장
             with st.expander(f"Details for {ticker}"):
@@ -1,9 +1,10 @@
 
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
+from bulk_fetch import fetch_watchlist
+from indicators import ABOVE, BELOW, compute_bands
 
 # 초기 종목 설정
 if "tickers" not in st.session_state:
@@ -29,12 +30,12 @@ for i, tkr in enumerate(st.session_state.tickers):
 # 데이터 로드
 end = datetime.today()
 start = end - timedelta(days=60)
-data = yf.download(st.session_state.tickers, start=start, end=end)["Adj Close"]
+# One fetch per run; the treemap, detail chart and signals all read from `bands`
+bands = compute_bands(fetch_watchlist(st.session_state.tickers, start, end))
 
 # Treemap 구성
-latest_prices = data.iloc[-1]
-previous_prices = data.iloc[-2]
-returns = ((latest_prices - previous_prices) / previous_prices) * 100
+latest_prices = bands.latest["current"]
+returns = bands.latest["change"]
 treemap_df = pd.DataFrame({
     "Ticker": latest_prices.index,
     "Return": returns.values,
@@ -51,29 +52,34 @@ fig = px.treemap(
 )
 st.plotly_chart(fig, use_container_width=True)
 
-# 종목 선택
-selected_ticker = st.selectbox("View chart and signals for:", st.session_state.tickers)
 
 # 상세 주가 및 시각 경고
-df = yf.download(selected_ticker, start=start, end=end)
-df["SMA15"] = df["Adj Close"].rolling(window=15).mean()
-df["Upper"] = df["SMA15"] * 1.05
-df["Lower"] = df["SMA15"] * 0.95
-
-st.subheader(f"{selected_ticker} Price Chart with Moving Averages")
-st.line_chart(df[["Adj Close", "SMA15", "Upper", "Lower"]])
-
-# 시각 경고
-current = df["Adj Close"].iloc[-1]
-upper = df["Upper"].iloc[-1]
-lower = df["Lower"].iloc[-1]
-if current > upper:
-    st.warning(f"{selected_ticker} is above the upper bound! ({current:.2f} > {upper:.2f})")
-elif current < lower:
-    st.warning(f"{selected_ticker} is below the lower bound! ({current:.2f} < {lower:.2f})")
-
-# 뉴스 (링크 제공)
-st.subheader("Latest News (Demo)")
-st.markdown(f"- [View {selected_ticker} on Yahoo Finance](https://finance.yahoo.com/quote/{selected_ticker})")
+# Reads the frames fetched above; changing the selection reruns only this fragment
+@st.fragment
+def detail(bands):
+    # 종목 선택
+    selected_ticker = st.selectbox("View chart and signals for:", list(bands.latest.index))
+
+    df = bands.frame(selected_ticker)
+    latest = bands.latest.loc[selected_ticker]
+
+    st.subheader(f"{selected_ticker} Price Chart with Moving Averages")
+    st.line_chart(df[["Adj Close", "SMA15", "Upper", "Lower"]])
+
+    # 시각 경고
+    current = latest["current"]
+    upper = latest["upper"]
+    lower = latest["lower"]
+    if latest["state"] == ABOVE:
+        st.warning(f"{selected_ticker} is above the upper bound! ({current:.2f} > {upper:.2f})")
+    elif latest["state"] == BELOW:
+        st.warning(f"{selected_ticker} is below the lower bound! ({current:.2f} < {lower:.2f})")
+
+    # 뉴스 (링크 제공)
+    st.subheader("Latest News (Demo)")
+    st.markdown(f"- [View {selected_ticker} on Yahoo Finance](https://finance.yahoo.com/quote/{selected_ticker})")
+
+
+detail(bands)
 
 st.caption("News API integration and email alerts coming soon...")
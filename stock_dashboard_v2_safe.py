@@ -1,9 +1,9 @@
 
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import datetime
+from fetch_planner import FetchPlan
+from indicators import ABOVE, BELOW, compute_bands
+from sector_map import default_store, fill_metadata, sector_treemap
 
 # 초기 종목 설정
 if "tickers" not in st.session_state:
@@ -28,98 +28,91 @@ for i, tkr in enumerate(st.session_state.tickers):
 
 # 날짜 범위 설정
 end = datetime.today()
-start = end - timedelta(days=60)
+
+# Treemap 범위
+metadata = default_store()
+universe = st.radio("Treemap", ["Watchlist", "S&P 500"], horizontal=True)
+treemap_tickers = list(st.session_state.tickers)
+if universe == "S&P 500":
+    treemap_tickers = metadata.universe("sp500")
+    if not treemap_tickers:
+        st.info("S&P 500 metadata not loaded yet; run `python sector_map.py refresh`.")
+        treemap_tickers = list(st.session_state.tickers)
 
 # 데이터 다운로드 (안정성 고려)
+# One plan per run: the treemap only needs the last two closes, the detail chart
+# and signals the full window, and each ticker is requested once for the widest.
+# Renders from the last known data and revalidates in the background; only a
+# cold cache waits on the network, and each view waits only for its own tickers.
 try:
-    raw_data = yf.download(
-        tickers=st.session_state.tickers,
-        start=start,
-        end=end,
-        group_by="ticker",
-        auto_adjust=False,
-        threads=True,
-        progress=False
-    )
+    plan = FetchPlan(end).need("treemap", treemap_tickers, sessions=2)
+    plan.need("detail", st.session_state.tickers, days=60).peek()
+    treemap_frames = plan.frames_for("treemap") or plan.fill("treemap").frames_for("treemap")
+    treemap_bands = compute_bands(treemap_frames)
 except Exception as e:
     st.error(f"❌ Error downloading stock data: {e}")
     st.stop()
 
-# 멀티인덱스 처리 및 유효성 검사
-if isinstance(raw_data.columns, pd.MultiIndex):
-    try:
-        if "Adj Close" not in raw_data.columns.get_level_values(1):
-            st.error("❌ 'Adj Close' not found in the downloaded data.")
-            st.stop()
-        data = raw_data.xs("Adj Close", axis=1, level=1)
-    except Exception as e:
-        st.error(f"❌ Failed to extract adjusted close prices: {e}")
-        st.stop()
-else:
-    # 단일 종목 처리
-    try:
-        data = pd.DataFrame({"Adj Close": raw_data["Adj Close"]})
-        data.columns = pd.MultiIndex.from_product([[st.session_state.tickers[0]], data.columns])
-    except Exception as e:
-        st.error(f"❌ Error formatting single ticker data: {e}")
-        st.stop()
-
-# 최근가 및 변동률 계산
+# Treemap 시각화
+# Sector -> industry -> ticker, sized by market cap; missing metadata fills in the background
 try:
-    latest_prices = data.iloc[-1]
-    previous_prices = data.iloc[-2]
-    returns = ((latest_prices - previous_prices) / previous_prices) * 100
+    fill_metadata(treemap_tickers, metadata)
+    fig = sector_treemap(treemap_bands, metadata, treemap_tickers)
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True)
+    loading = len(set(treemap_tickers) - set(treemap_frames))
+    if loading:
+        st.caption(f"{loading} symbols still loading; they appear on the next refresh.")
 except Exception as e:
-    st.error(f"❌ Error calculating returns: {e}")
+    st.error(f"❌ Error rendering treemap: {e}")
     st.stop()
 
-# Treemap 시각화
 try:
-    treemap_df = pd.DataFrame({
-        "Ticker": latest_prices.index,
-        "Return": returns.values,
-        "Price": latest_prices.values
-    })
-
-    fig = px.treemap(
-        treemap_df,
-        path=["Ticker"],
-        values=[1] * len(treemap_df),
-        color="Return",
-        color_continuous_scale="RdYlGn",
-        hover_data={"Price": True, "Return": True, "Ticker": False}
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    bands = compute_bands(plan.fill("detail").frames_for("detail"))
 except Exception as e:
-    st.error(f"❌ Error rendering treemap: {e}")
+    st.error(f"❌ Error downloading stock data: {e}")
+    st.stop()
+
+if bands.latest.empty:
+    st.error("❌ No price data for the selected tickers.")
     st.stop()
+missing = [t for t in st.session_state.tickers if t not in bands.latest.index]
+if missing:
+    st.warning(f"No data for: {', '.join(missing)}")
 
-# 종목 선택
-selected_ticker = st.selectbox("View chart and signals for:", st.session_state.tickers)
 
 # 개별 종목 주가 차트
-try:
-    df = yf.download(selected_ticker, start=start, end=end)
-    df["SMA15"] = df["Adj Close"].rolling(window=15).mean()
-    df["Upper"] = df["SMA15"] * 1.05
-    df["Lower"] = df["SMA15"] * 0.95
+# A fragment over already-fetched data: changing the selection reruns only this part
+@st.fragment
+def detail(bands):
+    # 종목 선택
+    selected_ticker = st.selectbox(
+        "View chart and signals for:", [t for t in st.session_state.tickers if t in bands.latest.index]
+    )
 
-    st.subheader(f"{selected_ticker} Price Chart with Moving Averages")
-    st.line_chart(df[["Adj Close", "SMA15", "Upper", "Lower"]])
+    try:
+        df = bands.frame(selected_ticker)
+        latest = bands.latest.loc[selected_ticker]
 
-    current = df["Adj Close"].iloc[-1]
-    upper = df["Upper"].iloc[-1]
-    lower = df["Lower"].iloc[-1]
-    if current > upper:
-        st.warning(f"{selected_ticker} is above the upper bound! ({current:.2f} > {upper:.2f})")
-    elif current < lower:
-        st.warning(f"{selected_ticker} is below the lower bound! ({current:.2f} < {lower:.2f})")
+        st.subheader(f"{selected_ticker} Price Chart with Moving Averages")
+        st.line_chart(df[["Adj Close", "SMA15", "Upper", "Lower"]])
 
-    st.subheader("Latest News (Demo)")
-    st.markdown(f"- [View {selected_ticker} on Yahoo Finance](https://finance.yahoo.com/quote/{selected_ticker})")
+        current = latest["current"]
+        upper = latest["upper"]
+        lower = latest["lower"]
+        if latest["state"] == ABOVE:
+            st.warning(f"{selected_ticker} is above the upper bound! ({current:.2f} > {upper:.2f})")
+        elif latest["state"] == BELOW:
+            st.warning(f"{selected_ticker} is below the lower bound! ({current:.2f} < {lower:.2f})")
 
-except Exception as e:
-    st.error(f"❌ Error loading chart or calculating indicators for {selected_ticker}: {e}")
-    st.stop()
+        st.subheader("Latest News (Demo)")
+        st.markdown(f"- [View {selected_ticker} on Yahoo Finance](https://finance.yahoo.com/quote/{selected_ticker})")
+
+    except Exception as e:
+        st.error(f"❌ Error loading chart or calculating indicators for {selected_ticker}: {e}")
+        st.stop()
+
+
+detail(bands)
 
 st.caption("All systems monitored with exception safety. News API and email alerts coming soon.")
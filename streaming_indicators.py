@@ -0,0 +1,229 @@
+import math
+import threading
+from collections import deque
+
+
+class StreamingIndicator:
+    # update(value) appends a new bar; update(value, new_bar=False) revises the
+    # latest bar with a fresh quote. Both are O(1) in the length of the history.
+    # Only the latest bar can be revised, so bulk loads pass checkpoint=False for
+    # every bar but the last and skip the snapshot entirely.
+    value = None
+    _checkpoint = None
+
+    def update(self, value, new_bar=True, checkpoint=True):
+        if not new_bar and self._checkpoint is not None:
+            self._restore(self._checkpoint)
+        elif checkpoint or not new_bar:
+            self._checkpoint = self._snapshot()
+        else:
+            self._checkpoint = None
+        self.value = self._push(float(value))
+        return self.value
+
+    def extend(self, values):
+        values = list(values)
+        for i, value in enumerate(values):
+            self.update(value, checkpoint=i == len(values) - 1)
+        return self.value
+
+    @classmethod
+    def from_history(cls, values, **params):
+        indicator = cls(**params)
+        indicator.extend(values)
+        return indicator
+
+    @property
+    def ready(self):
+        return self.value is not None
+
+    def _snapshot(self):
+        # Nested kernels and window buffers are copied; everything else is scalar
+        state = {"value": self.value}
+        for key, item in vars(self).items():
+            if key == "_checkpoint":
+                continue
+            if isinstance(item, StreamingIndicator):
+                item = item._snapshot()
+            elif isinstance(item, deque):
+                item = item.copy()
+            state[key] = item
+        return state
+
+    def _restore(self, state):
+        for key, item in state.items():
+            current = vars(self).get(key)
+            if isinstance(current, StreamingIndicator):
+                current._restore(item)
+            else:
+                # The checkpoint may serve several revisions of the same bar
+                setattr(self, key, item.copy() if isinstance(item, deque) else item)
+
+    def _push(self, x):
+        raise NotImplementedError
+
+
+class SMA(StreamingIndicator):
+    def __init__(self, window=15):
+        self.window = window
+        self._buf = deque()
+        self._sum = 0.0
+
+    def _push(self, x):
+        self._buf.append(x)
+        self._sum += x
+        if len(self._buf) > self.window:
+            self._sum -= self._buf.popleft()
+        return self._sum / self.window if len(self._buf) == self.window else None
+
+
+class EMA(StreamingIndicator):
+    # Matches pandas ewm(span=span, adjust=False).mean()
+    def __init__(self, span=20):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+
+    def _push(self, x):
+        if self.value is None:
+            return x
+        return self.value + self.alpha * (x - self.value)
+
+
+class RollingStd(StreamingIndicator):
+    # Sample standard deviation, as pandas rolling(window).std()
+    def __init__(self, window=20):
+        self.window = window
+        self._buf = deque()
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def _push(self, x):
+        self._buf.append(x)
+        self._sum += x
+        self._sumsq += x * x
+        if len(self._buf) > self.window:
+            old = self._buf.popleft()
+            self._sum -= old
+            self._sumsq -= old * old
+        if len(self._buf) < self.window:
+            return None
+        n = self.window
+        var = (self._sumsq - self._sum * self._sum / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class Bollinger(StreamingIndicator):
+    def __init__(self, window=20, k=2.0):
+        self.window = window
+        self.k = k
+        self._mid = SMA(window)
+        self._std = RollingStd(window)
+
+    def _push(self, x):
+        mid = self._mid.update(x, checkpoint=False)
+        std = self._std.update(x, checkpoint=False)
+        if mid is None:
+            return None
+        return (mid, mid + self.k * std, mid - self.k * std)
+
+
+class RSI(StreamingIndicator):
+    # Wilder smoothing as ewm(alpha=1/period, adjust=False) over gains and losses
+    def __init__(self, period=14):
+        self.period = period
+        self.alpha = 1.0 / period
+        self._prev = None
+        self._gain = None
+        self._loss = None
+
+    def _push(self, x):
+        if self._prev is None:
+            self._prev = x
+            return None
+        delta = x - self._prev
+        self._prev = x
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if self._gain is None:
+            self._gain, self._loss = gain, loss
+        else:
+            self._gain += self.alpha * (gain - self._gain)
+            self._loss += self.alpha * (loss - self._loss)
+        if self._loss == 0:
+            return 100.0 if self._gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + self._gain / self._loss)
+
+
+class MACD(StreamingIndicator):
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+
+    def _push(self, x):
+        macd = self._fast.update(x, checkpoint=False) - self._slow.update(x, checkpoint=False)
+        signal = self._signal.update(macd, checkpoint=False)
+        return (macd, signal, macd - signal)
+
+
+def default_kernels():
+    return {
+        "sma15": SMA(15),
+        "ema20": EMA(20),
+        "bollinger": Bollinger(20, 2.0),
+        "rsi": RSI(14),
+        "macd": MACD(12, 26, 9),
+    }
+
+
+class IndicatorSet:
+    def __init__(self, kernels=None):
+        self.kernels = kernels or default_kernels()
+
+    def update(self, value, new_bar=True, checkpoint=True):
+        return {name: kernel.update(value, new_bar, checkpoint) for name, kernel in self.kernels.items()}
+
+    def extend(self, values):
+        values = list(values)
+        for i, value in enumerate(values):
+            self.update(value, checkpoint=i == len(values) - 1)
+        return self.values()
+
+    def values(self):
+        return {name: kernel.value for name, kernel in self.kernels.items()}
+
+
+class IndicatorRegistry:
+    # Keeps one IndicatorSet per ticker alive across reruns and only pushes the
+    # bars that arrived since the last sync.
+    def __init__(self, factory=IndicatorSet):
+        self.factory = factory
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def sync(self, ticker, closes):
+        closes = closes.dropna()
+        if closes.empty:
+            return {}
+        with self._lock:
+            state = self._state.get(ticker)
+            if state is None or state[1] not in closes.index:
+                indicators = self.factory()
+                indicators.extend(closes.to_numpy())
+            else:
+                indicators, last_ts, last_value = state
+                if closes[last_ts] != last_value:
+                    # The previously latest bar was revised by a newer quote
+                    indicators.update(closes[last_ts], new_bar=False)
+                indicators.extend(closes[closes.index > last_ts].to_numpy())
+            self._state[ticker] = (indicators, closes.index[-1], closes.iloc[-1])
+            return indicators.values()
+
+    def drop(self, ticker):
+        with self._lock:
+            self._state.pop(ticker, None)
+
+
+indicator_registry = IndicatorRegistry()
@@ -0,0 +1,282 @@
+"""Local symbol master for ticker validation and prefix search.
+
+The app rebuilds the listing in the background when only the bundled seed is
+present or it is over a week old; ``python symbol_index.py refresh`` does the
+same offline.
+"""
+import contextlib
+import io
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+from bulk_fetch import fetch_watchlist
+from request_scheduler import CARD
+
+DEFAULT_LISTING = Path(os.getenv("SYMBOL_LISTING", Path(__file__).parent / "data" / "symbols.csv"))
+NASDAQ_LISTED = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
+OTHER_LISTED = "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+EXCHANGES = {"A": "NYSE American", "N": "NYSE", "P": "NYSE ARCA", "Z": "Cboe BZX", "V": "IEX"}
+SUGGESTIONS = 8
+# Recent bars upstream are proof enough for a symbol the listing does not carry
+PROBE_DAYS = 10
+PROBE_WORKERS = 4
+# Probe verdicts are shared across sessions for this long
+PROBE_TTL = 3600
+# A listing shorter than this is the bundled seed; either that or one older than
+# LISTING_MAX_AGE is rebuilt in the background, retried at most every LISTING_RETRY
+SEED_ROWS = 1000
+LISTING_MAX_AGE = 7 * 24 * 3600
+LISTING_RETRY = 3600
+
+SEPARATORS = re.compile(r"[\s,;|]+")
+# Yahoo forms no US listing carries: indices, exchange suffixes (005930.KS,
+# SHOP.TO), crypto and currency pairs, futures and FX
+YAHOO_ONLY = re.compile(r"^\^|\.[A-Z]{1,3}$|-(USD|USDT|EUR|GBP|JPY|KRW|BTC|ETH)$|=[A-Z]$")
+# US share classes (BRK.B, BF.B, HEI.A); no Yahoo exchange suffix is one of these letters
+SHARE_CLASS = re.compile(r"^([A-Z]{1,5})\.([A-C])$")
+
+log = logging.getLogger("symbol_index")
+
+
+class SymbolIndex:
+    # Symbols kept as one sorted array: membership and prefix ranges are
+    # binary searches, bulk validation is a single vectorized searchsorted.
+    def __init__(self, symbols, names=None):
+        symbols = np.char.upper(np.asarray(symbols, dtype=str))
+        order = np.argsort(symbols, kind="stable")
+        self.symbols = symbols[order]
+        self.names = np.asarray(names, dtype=object)[order] if names is not None else None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _positions(self, symbols):
+        pos = np.searchsorted(self.symbols, symbols)
+        hit = np.zeros(len(symbols), dtype=bool)
+        inside = pos < len(self.symbols)
+        hit[inside] = self.symbols[pos[inside]] == symbols[inside]
+        return pos, hit
+
+    def _resolve(self, symbols):
+        # Position of each symbol's listed form, -1 if unlisted: as typed, else
+        # with the share-class dot dashed (BRK.B -> BRK-B) when the listing has that
+        symbols = np.array(symbols, dtype=str)
+        pos, hit = self._positions(symbols)
+        dashed_pos, dashed_hit = self._positions(np.char.replace(symbols, ".", "-"))
+        return np.where(hit, pos, np.where(dashed_hit, dashed_pos, -1))
+
+    def __contains__(self, symbol):
+        if not len(self):
+            return True
+        return bool(self._resolve([normalize(symbol)])[0] >= 0)
+
+    def name(self, symbol):
+        if self.names is None or not len(self):
+            return None
+        pos = self._resolve([normalize(symbol)])[0]
+        return self.names[pos] if pos >= 0 else None
+
+    def prefix(self, query, limit=SUGGESTIONS):
+        query = listing_symbol(query)
+        if not query or not len(self):
+            return []
+        lo = np.searchsorted(self.symbols, query, side="left")
+        hi = np.searchsorted(self.symbols, query + "\uffff", side="left")
+        return self.symbols[lo:min(hi, lo + limit)].tolist()
+
+    def validate(self, symbols):
+        # Returns (known, unknown), both deduplicated and in input order. Listed
+        # symbols come back in their listed form and Yahoo-only forms pass as
+        # typed; unknown ones are worth a probe() rather than a rejection. An
+        # empty index (no listing file) accepts everything.
+        symbols = list(dict.fromkeys(s for s in (normalize(s) for s in symbols) if s))
+        if not symbols or not len(self):
+            return symbols, []
+        known, unknown = [], []
+        for symbol, pos in zip(symbols, self._resolve(symbols)):
+            if pos >= 0:
+                known.append(str(self.symbols[pos]))
+            elif YAHOO_ONLY.search(symbol):
+                known.append(symbol)
+            else:
+                unknown.append(symbol)
+        return list(dict.fromkeys(known)), unknown
+
+
+def normalize(symbol):
+    # Yahoo writes share classes with a dash: BF.B -> BF-B
+    return SHARE_CLASS.sub(r"\1-\2", str(symbol).strip().upper())
+
+
+def listing_symbol(symbol):
+    # Listings write share classes as BRK.B, Yahoo wants BRK-B
+    return normalize(symbol).replace(".", "-")
+
+
+def probe(symbols, priority=CARD):
+    # Symbols the listing does not carry are kept if upstream has recent bars.
+    # Each goes alone: a lone empty symbol lands in the negative cache, while an
+    # empty batch of several would read as an upstream outage.
+    if not symbols:
+        return []
+    end = datetime.today()
+    start = end - timedelta(days=PROBE_DAYS)
+
+    def listed(symbol):
+        df = fetch_watchlist([symbol], start, end, priority=priority).get(symbol)
+        return df is not None and not df.empty
+
+    with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(symbols))) as pool:
+        return [s for s, ok in zip(symbols, pool.map(listed, symbols)) if ok]
+
+
+class Prober:
+    # Runs probe() off the caller's thread so an Add callback never waits on
+    # upstream; verdicts are shared by every session for PROBE_TTL
+    def __init__(self, ttl=PROBE_TTL):
+        self.ttl = ttl
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def submit(self, symbols, priority=CARD):
+        now = time.monotonic()
+        with self._lock:
+            pending = [
+                s for s in dict.fromkeys(symbols)
+                if s not in self._results or (self._results[s] is not None and self._results[s][1] < now)
+            ]
+            for symbol in pending:
+                self._results[symbol] = None
+        if pending:
+            threading.Thread(target=self._run, args=(pending, priority), name="probe", daemon=True).start()
+        return pending
+
+    def result(self, symbol):
+        # True or False once probed, None while in flight or never submitted
+        with self._lock:
+            entry = self._results.get(symbol)
+        return None if entry is None else entry[0]
+
+    def _run(self, symbols, priority):
+        try:
+            found = set(probe(symbols, priority))
+        except Exception:
+            log.exception("symbol probe failed")
+            with self._lock:
+                for symbol in symbols:
+                    self._results.pop(symbol, None)
+            return
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for symbol in symbols:
+                self._results[symbol] = (symbol in found, expires)
+
+
+prober = Prober()
+
+
+def parse_symbols(text):
+    return [s for s in SEPARATORS.split(text or "") if s]
+
+
+def symbols_from_csv(data):
+    df = pd.read_csv(io.BytesIO(data) if isinstance(data, bytes) else data)
+    for column in df.columns:
+        if str(column).strip().lower() in ("symbol", "ticker", "tickers", "symbols"):
+            return df[column].dropna().astype(str).tolist()
+    # No header we recognise: the first column is the symbol, header row included
+    return [str(df.columns[0])] + df.iloc[:, 0].dropna().astype(str).tolist()
+
+
+def load_index(path=DEFAULT_LISTING):
+    path = Path(path)
+    if not path.exists():
+        return SymbolIndex([])
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return SymbolIndex(df["Symbol"].to_numpy(), df["Name"].to_numpy())
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+_rebuilding = False
+_rebuild_tried = None
+
+
+def _rebuild_listing(path):
+    global _rebuilding
+    try:
+        log.info("rebuilt symbol listing with %d symbols", refresh_listing(path))
+    except Exception:
+        log.exception("symbol listing rebuild failed")
+    finally:
+        with _index_lock:
+            _rebuilding = False
+
+
+def get_index(path=DEFAULT_LISTING):
+    # Reloaded only when the listing file changes on disk. The bundled seed, or
+    # a stale listing, keeps serving while the full one is built behind it.
+    global _index, _index_mtime, _rebuilding, _rebuild_tried
+    path = Path(path)
+    mtime = path.stat().st_mtime if path.exists() else None
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            _index = load_index(path)
+            _index_mtime = mtime
+        outdated = len(_index) < SEED_ROWS or mtime is None or time.time() - mtime > LISTING_MAX_AGE
+        due = _rebuild_tried is None or time.monotonic() - _rebuild_tried > LISTING_RETRY
+        if outdated and due and not _rebuilding:
+            _rebuilding = True
+            _rebuild_tried = time.monotonic()
+            threading.Thread(target=_rebuild_listing, args=(path,), name="symbol-listing", daemon=True).start()
+        return _index
+
+
+def _read_listing(url, symbol_column, exchange):
+    text = requests.get(url, timeout=30).text
+    df = pd.read_csv(io.StringIO(text), sep="|", dtype=str, keep_default_na=False)
+    # Also drops the "File Creation Time: ..." trailer, which has no Test Issue flag
+    df = df[df["Test Issue"] == "N"]
+    return pd.DataFrame({
+        "Symbol": df[symbol_column].map(listing_symbol),
+        "Name": df["Security Name"],
+        "Exchange": exchange(df),
+    })
+
+
+def refresh_listing(path=DEFAULT_LISTING):
+    nasdaq = _read_listing(NASDAQ_LISTED, "Symbol", lambda df: "NASDAQ")
+    other = _read_listing(OTHER_LISTED, "ACT Symbol", lambda df: df["Exchange"].map(EXCHANGES).fillna(df["Exchange"]))
+    listing = pd.concat([nasdaq, other]).drop_duplicates("Symbol").sort_values("Symbol")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Every app process may rebuild at startup; each writes its own temp file
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        listing.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+    return len(listing)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["refresh"]:
+        sys.exit("usage: python symbol_index.py refresh")
+    print(f"wrote {refresh_listing()} symbols to {DEFAULT_LISTING}")
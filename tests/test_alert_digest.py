@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from alert_digest import AlertCoalescer
+from notifications import PENDING, PushOutbox
+
+
+def coalescer(tmp_path, token="token-a"):
+    return AlertCoalescer(PushOutbox(token, path=tmp_path / "alerts.sqlite3"))
+
+
+def test_flush_queues_one_digest_and_consumes_pending(tmp_path):
+    digest = coalescer(tmp_path)
+    assert digest.submit("TSLA", "above", 250.0, 240.0)
+    assert digest.submit("AAPL", "below", 150.0, 160.0)
+    assert not digest.submit("TSLA", "above", 251.0, 240.0)
+    message_id = digest.flush(force=True)
+    assert digest.outbox.status(message_id)["status"] == PENDING
+    assert digest.flush(force=True) is None
+
+
+def test_failed_enqueue_keeps_pending_rows(tmp_path, monkeypatch):
+    digest = coalescer(tmp_path)
+    digest.submit("TSLA", "above", 250.0, 240.0)
+
+    def busy(conn, title, body):
+        raise sqlite3.OperationalError("database is locked")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(digest.outbox, "insert", busy)
+        with pytest.raises(sqlite3.OperationalError):
+            digest.flush(force=True)
+    assert digest.outbox.counts() == {}
+    message_id = digest.flush(force=True)
+    assert digest.outbox.counts() == {PENDING: 1}
+    assert digest.outbox.status(message_id) is not None
+
+
+def test_recipients_are_deduplicated_and_flushed_separately(tmp_path):
+    first = coalescer(tmp_path, "token-a")
+    second = coalescer(tmp_path, "token-b")
+    assert first.submit("TSLA", "above", 250.0, 240.0)
+    assert second.submit("TSLA", "above", 250.0, 240.0)
+    first.flush(force=True)
+    assert first.outbox.counts() == {PENDING: 1}
+    assert second.outbox.counts() == {}
+    second.flush(force=True)
+    assert second.outbox.counts() == {PENDING: 1}
+
+
+def test_reversal_during_cooldown_is_still_pushed(tmp_path):
+    digest = coalescer(tmp_path)
+    assert digest.submit("TSLA", "above", 250.0, 240.0)
+    assert not digest.submit("TSLA", "above", 262.0, 250.0)
+    assert digest.submit("TSLA", "below", 220.0, 228.0)
+
+
+def test_cooldown_table_without_direction_is_recreated(tmp_path):
+    path = tmp_path / "alerts.sqlite3"
+    coalescer(tmp_path)
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        "DROP TABLE alert_cooldown;"
+        "CREATE TABLE alert_cooldown (recipient TEXT NOT NULL, ticker TEXT NOT NULL, until REAL NOT NULL,"
+        " PRIMARY KEY (recipient, ticker));"
+    )
+    conn.close()
+    digest = coalescer(tmp_path)
+    assert digest.submit("TSLA", "above", 250.0, 240.0)
+    assert digest.submit("TSLA", "below", 220.0, 228.0)
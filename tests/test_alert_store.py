@@ -0,0 +1,60 @@
+import sqlite3
+import time
+
+import pandas as pd
+
+import alert_worker
+import fetch_planner
+from alert_store import AlertStore
+
+
+def test_remove_in_one_session_keeps_other_sessions_and_state(tmp_path):
+    store = AlertStore(tmp_path / "alerts.sqlite3")
+    store.touch_watchlist("a", ["TSLA", "AAPL"])
+    store.touch_watchlist("b", ["TSLA"])
+    store.transition("TSLA", "above")
+
+    store.touch_watchlist("a", ["AAPL"])
+    store.prune()
+    assert sorted(store.tickers()) == ["AAPL", "TSLA"]
+    assert store.states() == {"TSLA": "above"}
+
+    store.touch_watchlist("b", [])
+    store.prune()
+    assert store.tickers() == ["AAPL"]
+    assert store.states() == {}
+
+
+def test_idle_sessions_are_pruned(tmp_path):
+    store = AlertStore(tmp_path / "alerts.sqlite3")
+    store.touch_watchlist("old", ["NVDA"])
+    store.touch_watchlist("live", ["MSFT"])
+    with store._conn() as conn:
+        conn.execute("UPDATE watchlist_member SET seen_at = ? WHERE session_id = 'old'", (time.time() - 3600,))
+    store.transition("NVDA", "below")
+    store.prune(ttl=60)
+    assert store.tickers() == ["MSFT"]
+    assert store.states() == {}
+
+
+def test_legacy_shared_watchlist_is_carried_over(tmp_path):
+    path = tmp_path / "alerts.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE watchlist (ticker TEXT PRIMARY KEY, added_at TEXT NOT NULL)")
+    conn.execute("INSERT INTO watchlist VALUES ('AMZN', '2024-01-01T00:00:00+00:00')")
+    conn.commit()
+    conn.close()
+    assert AlertStore(path).tickers() == ["AMZN"]
+
+
+def test_persistent_breach_on_the_worker_list_alerts_once(tmp_path, monkeypatch):
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=40)
+    close = pd.Series(100.0, index=index)
+    close.iloc[-1] = 130.0
+    monkeypatch.setattr(fetch_planner, "fetch_watchlist", lambda tickers, *a, **k: {t: pd.DataFrame({"Close": close}) for t in tickers})
+    monkeypatch.setenv("WATCHLIST", "TSLA")
+    store = AlertStore(tmp_path / "alerts.sqlite3")
+
+    alerts = [alert_worker.run_once(store, None) for _ in range(3)]
+    assert [len(a) for a in alerts] == [1, 0, 0]
+    assert store.states() == {"TSLA": "above"}
@@ -0,0 +1,66 @@
+import multiprocessing
+import threading
+
+import pandas as pd
+
+from bar_store import BarStore
+
+
+def daily(start, periods, close=100.0):
+    index = pd.bdate_range(start, periods=periods)
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0}, index=index)
+
+
+def test_concurrent_writers_do_not_share_a_temp_file(tmp_path):
+    # Separate instances stand in for the worker and the app process
+    stores = [BarStore(tmp_path) for _ in range(8)]
+    errors = []
+
+    def write(store, i):
+        try:
+            for _ in range(5):
+                store.save("AAPL", daily("2024-01-01", 200, close=100.0 + i))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(s, i)) for i, s in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(stores[0].load("AAPL")) == 200
+    assert list(tmp_path.glob("*.tmp")) == [] and list(tmp_path.glob(".*.tmp")) == []
+
+
+def test_merge_keeps_newest_bar_and_levels(tmp_path):
+    store = BarStore(tmp_path)
+    store.merge("AAPL", daily("2024-01-01", 60))
+    store.merge("AAPL", daily("2024-03-22", 1, close=110.0))
+    bars = store.load("AAPL")
+    assert bars["Close"].iloc[-1] == 110.0
+    assert store.load_level("AAPL", "1wk")["Close"].iloc[-1] == 110.0
+
+
+def _merge_chunks(root, offset):
+    store = BarStore(root)
+    for i in range(offset, 40, 2):
+        store.merge("AAPL", daily(pd.Timestamp("2020-01-01") + pd.offsets.BDay(5 * i), 5))
+
+
+def test_merges_from_two_processes_keep_every_bar(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_merge_chunks, args=(tmp_path, offset)) for offset in (0, 1)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert len(BarStore(tmp_path).load("AAPL")) == 200
+
+
+def test_backfill_coverage_is_written_with_its_bars(tmp_path):
+    store = BarStore(tmp_path)
+    store.merge("NEWCO", daily("2022-06-01", 20), covered_from="2019-03-01")
+    assert store.covered_from("NEWCO") == pd.Timestamp("2019-03-01")
+    store.merge("NEWCO", daily("2022-07-01", 1), covered_from="2020-01-01")
+    assert store.covered_from("NEWCO") == pd.Timestamp("2019-03-01")
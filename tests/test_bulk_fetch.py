@@ -0,0 +1,238 @@
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+import yfinance as yf
+
+import bulk_fetch
+import timeframes
+from bar_store import BarStore
+from fetch_planner import FetchPlan
+from price_cache import HistoryCache, NegativeCache
+from request_scheduler import CARD, DETAIL, PREFETCH, RequestScheduler
+
+
+def bars(start, end, freq="B"):
+    index = pd.date_range(start, end, freq=freq)
+    close = pd.Series(range(len(index)), index=index, dtype=float) + 100
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0})
+
+
+class FakeYahoo:
+    # Serves yf.download and Ticker.history from a per-(ticker, interval) table
+    def __init__(self):
+        self.data = {}
+        self.downloads = []
+
+    def download(self, tickers, start, end, interval="1d", **kwargs):
+        self.downloads.append((tuple(tickers), pd.Timestamp(start), interval))
+        frames = {t: self._slice(t, start, end, interval) for t in tickers}
+        frames = {t: df for t, df in frames.items() if not df.empty}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    def ticker(self, symbol):
+        fake = self
+
+        class Ticker:
+            def history(self, start, end, interval="1d"):
+                return fake._slice(symbol, start, end, interval)
+
+        return Ticker()
+
+    def _slice(self, ticker, start, end, interval):
+        df = self.data.get((ticker, interval))
+        if df is None:
+            return pd.DataFrame()
+        return df.loc[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
+
+
+@pytest.fixture
+def yahoo(monkeypatch, tmp_path):
+    fake = FakeYahoo()
+    monkeypatch.setattr(yf, "download", fake.download)
+    monkeypatch.setattr(yf, "Ticker", fake.ticker)
+    monkeypatch.setattr(bulk_fetch, "history_cache", HistoryCache())
+    monkeypatch.setattr(bulk_fetch, "negative_cache", NegativeCache())
+    monkeypatch.setattr(bulk_fetch, "bar_store", BarStore(tmp_path))
+    monkeypatch.setattr(bulk_fetch, "in_flight", bulk_fetch.SingleFlight())
+    monkeypatch.setattr(bulk_fetch, "scheduler", RequestScheduler())
+    return fake
+
+
+def test_missing_intraday_bars_do_not_block_daily_history(yahoo):
+    yahoo.data[("VFIAX", "1d")] = bars("2024-01-01", "2024-03-01")
+    yahoo.data[("AAPL", "5m")] = bars("2024-02-20", "2024-03-01", freq="5min")
+    start, end = pd.Timestamp("2024-02-20"), pd.Timestamp("2024-03-01")
+    assert list(bulk_fetch.fetch_watchlist(["AAPL", "VFIAX"], start, end, interval="5m")) == ["AAPL"]
+    assert bulk_fetch.negative_cache.blocked("VFIAX", "5m")
+    frames = bulk_fetch.fetch_watchlist(["VFIAX"], start, end)
+    assert not frames["VFIAX"].empty
+
+
+def test_empty_batch_of_several_symbols_counts_against_the_breaker(yahoo):
+    start, end = pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-01")
+    # Upstream down: yfinance swallows the error and returns nothing for anyone
+    assert bulk_fetch.fetch_watchlist(["AAPL", "MSFT"], start, end, interval="5m") == {}
+    metrics = bulk_fetch.scheduler.metrics()["yfinance"]
+    assert metrics["failed"] == 1
+    assert metrics["error_rate"] == 1.0
+    assert not bulk_fetch.negative_cache.blocked("AAPL", "5m")
+    assert not bulk_fetch.negative_cache.blocked("MSFT", "5m")
+
+
+def test_lone_unknown_symbol_is_negative_cached_not_an_outage(yahoo):
+    yahoo.data[("AAPL", "1d")] = bars("2024-01-01", "2024-03-01")
+    start, end = pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-01")
+    for _ in range(3):
+        assert bulk_fetch.fetch_watchlist(["AAPLL"], start, end) == {}
+    assert len(yahoo.downloads) == 1
+    assert bulk_fetch.negative_cache.blocked("AAPLL")
+    assert bulk_fetch.scheduler.metrics()["yfinance"]["failed"] == 0
+
+    for typo in ["QQQQ", "MSFTT", "GOOGLL", "TSLAA", "NVDAA", "AMZNN", "METAA", "NFLXX", "AMDD", "INTCC"]:
+        bulk_fetch.fetch_watchlist([typo], start, end)
+    assert not bulk_fetch.scheduler.circuit_open("yfinance")
+    assert not bulk_fetch.fetch_watchlist(["AAPL"], start, end)["AAPL"].empty
+
+
+def test_failed_fallback_for_a_lone_symbol_is_an_outage(yahoo, monkeypatch):
+    def down(*args, **kwargs):
+        raise ConnectionError("upstream down")
+
+    monkeypatch.setattr(bulk_fetch, "_history", down)
+    start, end = pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-01")
+    assert bulk_fetch.fetch_watchlist(["AAPL"], start, end, interval="5m") == {}
+    assert not bulk_fetch.negative_cache.blocked("AAPL", "5m")
+    assert bulk_fetch.scheduler.metrics()["yfinance"]["failed"] == 1
+
+
+def test_outage_serves_stored_daily_bars(yahoo):
+    yahoo.data[("AAPL", "1d")] = bars("2024-01-01", "2024-02-15")
+    start, end = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-03-01")
+    bulk_fetch.fetch_watchlist(["AAPL"], start, end)
+    bulk_fetch.history_cache.clear()
+    yahoo.data.clear()
+    frames = bulk_fetch.fetch_watchlist(["AAPL"], start, end)
+    assert frames["AAPL"].index[-1] == pd.Timestamp("2024-02-15")
+    assert not bulk_fetch.negative_cache.blocked("AAPL")
+
+
+def test_late_listing_is_backfilled_once(yahoo):
+    yahoo.data[("NEWCO", "1d")] = bars("2022-06-01", "2024-03-01")
+    start, end = pd.Timestamp("2019-03-01"), pd.Timestamp("2024-03-01")
+    for _ in range(3):
+        bulk_fetch.history_cache.clear()
+        frames = bulk_fetch.fetch_watchlist(["NEWCO"], start, end)
+        assert frames["NEWCO"].index[0] == pd.Timestamp("2022-06-01")
+    starts = [s for _, s, _ in yahoo.downloads]
+    assert starts[0] == start
+    # Later calls only re-request the last stored day
+    assert starts[1:] == [pd.Timestamp("2024-02-29")] * 2
+    # A wider range still goes upstream once for the older part
+    bulk_fetch.history_cache.clear()
+    bulk_fetch.fetch_watchlist(["NEWCO"], pd.Timestamp("2014-03-01"), end)
+    assert yahoo.downloads[-1][1] == pd.Timestamp("2014-03-01")
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_card_follower_promotes_a_queued_prefetch_leader(yahoo, monkeypatch):
+    scheduler = RequestScheduler(limits={"yfinance": (100, 100, 1)})
+    monkeypatch.setattr(bulk_fetch, "scheduler", scheduler)
+    yahoo.data[("AAPL", "5m")] = bars("2024-01-02", "2024-01-05", freq="5min")
+    ran = []
+    download = yahoo.download
+    monkeypatch.setattr(yf, "download", lambda *a, **kw: ran.append("AAPL") or download(*a, **kw))
+
+    # The only worker is busy, so everything below queues up behind it
+    gate = threading.Event()
+    scheduler.submit("yfinance", gate.wait)
+    fetch = lambda priority: bulk_fetch.fetch_watchlist(["AAPL"], "2024-01-02", "2024-01-05", "5m", priority)
+    prefetch = threading.Thread(target=fetch, args=(PREFETCH,))
+    prefetch.start()
+    wait_for(lambda: scheduler.metrics()["yfinance"]["queued"].get("prefetch"))
+    scheduler.submit("yfinance", ran.append, "detail", priority=DETAIL)
+
+    card = {}
+    follower = threading.Thread(target=lambda: card.update(fetch(CARD)))
+    follower.start()
+    try:
+        wait_for(lambda: scheduler.metrics()["yfinance"]["promoted"])
+    finally:
+        gate.set()
+    follower.join(5)
+    prefetch.join(5)
+    wait_for(lambda: len(ran) == 2)
+
+    assert ran == ["AAPL", "detail"]
+    assert not card["AAPL"].empty
+    assert len(yahoo.downloads) == 1
+
+
+def test_timeframe_switch_never_waits_on_upstream(yahoo, monkeypatch):
+    today = pd.Timestamp.today().normalize()
+    yahoo.data[("AAPL", "5m")] = bars(today - pd.Timedelta(days=3), today, freq="5min")
+    gate = threading.Event()
+    download = yahoo.download
+    monkeypatch.setattr(yf, "download", lambda *a, **kw: gate.wait(5) and download(*a, **kw))
+
+    try:
+        # Cold: a placeholder while the base series loads in the background
+        assert timeframes.timeframe_bands("AAPL", "1D") is None
+        assert bulk_fetch.refreshing(["AAPL"], interval=None) == ["AAPL"]
+        assert bulk_fetch.refreshing(["AAPL"]) == []
+    finally:
+        gate.set()
+    wait_for(lambda: not bulk_fetch.refreshing(["AAPL"], interval=None))
+    assert not timeframes.timeframe_bands("AAPL", "1D").empty
+
+
+def test_weekly_range_reads_levels_and_refreshes_behind(yahoo, monkeypatch):
+    monkeypatch.setattr(timeframes, "bar_store", bulk_fetch.bar_store)
+    today = pd.Timestamp.today().normalize()
+    yahoo.data[("AAPL", "1d")] = bars(today - pd.Timedelta(days=6 * 365), today)
+    gate = threading.Event()
+    download = yahoo.download
+    monkeypatch.setattr(yf, "download", lambda *a, **kw: gate.wait(5) and download(*a, **kw))
+
+    try:
+        assert timeframes.timeframe_bands("AAPL", "5Y") is None
+        assert bulk_fetch.refreshing(["AAPL"]) == ["AAPL"]
+    finally:
+        gate.set()
+    wait_for(lambda: not bulk_fetch.refreshing(["AAPL"]))
+    weekly = timeframes.timeframe_bands("AAPL", "5Y")
+    assert len(weekly) > 200
+
+
+def test_plan_fill_waits_only_on_cold_tickers(yahoo):
+    yahoo.data[("AAPL", "1d")] = bars("2024-01-01", "2024-03-01")
+    yahoo.data[("MSFT", "1d")] = bars("2024-01-01", "2024-03-01")
+    end = pd.Timestamp("2024-03-01")
+    bulk_fetch.bar_store.merge("AAPL", yahoo.data[("AAPL", "1d")])
+
+    plan = FetchPlan(end).need("detail", ["AAPL", "MSFT"], days=30).peek()
+    assert list(plan.frames) == ["AAPL"]
+    plan.fill()
+    assert sorted(plan.frames) == ["AAPL", "MSFT"]
+    wait_for(lambda: not bulk_fetch.refreshing(["AAPL", "MSFT"]))
+
+
+def test_plan_fill_can_wait_for_one_consumer(yahoo):
+    for ticker in ["AAPL", "MSFT"]:
+        yahoo.data[(ticker, "1d")] = bars("2024-01-01", "2024-03-01")
+    end = datetime(2024, 3, 1)
+
+    plan = FetchPlan(end).need("treemap", ["MSFT"], sessions=2)
+    plan.need("detail", ["AAPL"], days=30).peek().fill("detail")
+    assert "AAPL" in plan.frames and "MSFT" not in plan.frames
+    wait_for(lambda: not bulk_fetch.refreshing(["AAPL", "MSFT"]))
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import plotly.tools
+
+import charts
+from charts import FigureCache, card_figure, cached_card_figure
+
+
+def bands(periods=260):
+    close = pd.Series(100 + np.arange(periods, dtype=float), index=pd.bdate_range("2023-01-02", periods=periods))
+    return pd.DataFrame({"Adj Close": close, "SMA15": close, "Upper": close * 1.05, "Lower": close * 0.95})
+
+
+def wire_spec(figure):
+    # What st.plotly_chart sends to the browser
+    return pio.to_json(plotly.tools.return_figure_from_figure_or_data(figure, validate_figure=True), validate=False)
+
+
+def test_cached_figure_sends_the_same_spec_and_cannot_be_mutated(monkeypatch):
+    monkeypatch.setattr(charts, "figure_cache", FigureCache())
+    df = bands()
+    cached = cached_card_figure("AAPL", df)
+    assert wire_spec(cached) == wire_spec(card_figure(df))
+
+    cached.to_dict()["layout"]["height"] = 999
+    again = cached_card_figure("AAPL", df)
+    assert again.to_dict()["layout"]["height"] == charts.CARD_HEIGHT
+    assert charts.figure_cache.stats()["hits"] == 1
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import ABOVE, NEUTRAL, SMA_WINDOW, compute_bands
+
+
+def closes(index, start=100.0):
+    return pd.DataFrame({"Close": np.arange(len(index), dtype=float) + start}, index=index)
+
+
+def reference(df):
+    close = df["Close"]
+    sma = close.rolling(SMA_WINDOW).mean()
+    return close.iloc[-1], close.iloc[-2], sma.iloc[-1]
+
+
+@pytest.fixture
+def weekdays():
+    return pd.bdate_range("2024-01-01", periods=40)
+
+
+def test_single_ticker_matches_pandas(weekdays):
+    df = closes(weekdays)
+    latest = compute_bands({"AAPL": df}).latest.loc["AAPL"]
+    current, previous, sma = reference(df)
+    assert latest["current"] == current
+    assert latest["previous"] == previous
+    assert latest["sma"] == pytest.approx(sma)
+    assert latest["state"] == ABOVE
+
+
+def test_mixed_calendars_use_each_tickers_own_rows(weekdays):
+    # Crypto trades on weekends; the equity's SMA must not see those dates as gaps
+    stock = closes(weekdays)
+    crypto = closes(pd.date_range(weekdays[0], weekdays[-1]), start=1000.0)
+    bands = compute_bands({"AAPL": stock, "BTC-USD": crypto})
+    for ticker, df in (("AAPL", stock), ("BTC-USD", crypto)):
+        latest = bands.latest.loc[ticker]
+        current, previous, sma = reference(df)
+        assert latest["previous"] == previous
+        assert latest["sma"] == pytest.approx(sma)
+        assert bands.frame(ticker)["SMA15"].iloc[-1] == pytest.approx(sma)
+    assert bands.latest.loc["AAPL", "state"] == ABOVE
+
+
+def test_dropped_bar_keeps_sma_and_change(weekdays):
+    stock = closes(weekdays)
+    gappy = stock.drop(weekdays[-2])
+    latest = compute_bands({"AAPL": stock, "005930.KS": gappy}).latest.loc["005930.KS"]
+    current, previous, sma = reference(gappy)
+    assert latest["previous"] == previous
+    assert latest["change"] == pytest.approx((current - previous) / previous * 100)
+    assert latest["sma"] == pytest.approx(sma)
+    assert latest["state"] != NEUTRAL
+
+
+def test_ticker_missing_latest_date_reports_its_own_last_bar(weekdays):
+    stock = closes(weekdays)
+    lagging = stock.iloc[:-3]
+    latest = compute_bands({"AAPL": stock, "SHOP.TO": lagging}).latest.loc["SHOP.TO"]
+    current, previous, sma = reference(lagging)
+    assert latest["as_of"] == lagging.index[-1]
+    assert (latest["current"], latest["previous"]) == (current, previous)
+    assert latest["sma"] == pytest.approx(sma)
+
+
+def test_short_history_has_no_sma(weekdays):
+    latest = compute_bands({"NEW": closes(weekdays[:5])}).latest.loc["NEW"]
+    assert np.isnan(latest["sma"])
+    assert latest["state"] == NEUTRAL
@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import notifications
+from notifications import FAILED, PENDING, SENT, PushOutbox
+
+
+class PushbulletStandIn(BaseHTTPRequestHandler):
+    # Replies with the next scripted status; "slow" sleeps past the client timeout
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.received.append((self.headers["Access-Token"], body))
+        reply = server.script.pop(0) if server.script else 200
+        if reply == "slow":
+            time.sleep(0.5)
+            reply = 200
+        self.send_response(reply)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), PushbulletStandIn)
+    httpd.script = []
+    httpd.received = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(notifications, "BACKOFF_BASE", 0.01)
+
+
+def outbox(server, tmp_path, token="good-token", **kwargs):
+    url = f"http://127.0.0.1:{server.server_port}/v2/pushes"
+    return PushOutbox(token, path=tmp_path / "alerts.sqlite3", url=url, **kwargs)
+
+
+def drain_until_settled(box, message_id, deadline=5.0):
+    stop = time.monotonic() + deadline
+    while box.status(message_id)["status"] == PENDING and time.monotonic() < stop:
+        box.drain_once()
+        time.sleep(0.02)
+    return box.status(message_id)
+
+
+def test_delivers_note(server, tmp_path):
+    box = outbox(server, tmp_path)
+    message_id = box.enqueue("TSLA above band", "TSLA 250.00 > 240.00")
+    assert box.drain_once() == 1
+    status = box.status(message_id)
+    assert status["status"] == SENT
+    assert status["attempts"] == 1
+    assert server.received == [("good-token", {"type": "note", "title": "TSLA above band", "body": "TSLA 250.00 > 240.00"})]
+
+
+def test_retries_after_server_error(server, tmp_path):
+    server.script = [503, 502]
+    box = outbox(server, tmp_path)
+    message_id = box.enqueue("title", "body")
+    status = drain_until_settled(box, message_id)
+    assert status["status"] == SENT
+    assert status["attempts"] == 3
+    assert len(server.received) == 3
+
+
+def test_unauthorized_fails_without_retry(server, tmp_path):
+    server.script = [401]
+    box = outbox(server, tmp_path)
+    message_id = box.enqueue("title", "body")
+    status = drain_until_settled(box, message_id)
+    assert status["status"] == FAILED
+    assert status["attempts"] == 1
+    assert status["last_error"] == "HTTP 401"
+
+
+def test_timeout_is_retried(server, tmp_path, monkeypatch):
+    # A backoff of seconds keeps the retry out of the first drain; the test then
+    # makes the row due itself instead of waiting
+    monkeypatch.setattr(notifications, "BACKOFF_BASE", 10.0)
+    server.script = ["slow"]
+    box = outbox(server, tmp_path, timeout=0.1)
+    message_id = box.enqueue("title", "body")
+    box.drain_once()
+    status = box.status(message_id)
+    assert status["status"] == PENDING
+    assert status["attempts"] == 1
+    assert status["last_error"]
+    with box._conn() as conn:
+        conn.execute("UPDATE outbox SET next_attempt_at = 0 WHERE id = ?", (message_id,))
+    assert drain_until_settled(box, message_id)["status"] == SENT
+
+
+def test_outbox_only_claims_its_own_tokens_rows(server, tmp_path):
+    worker = outbox(server, tmp_path, token="good-token")
+    tokenless = outbox(server, tmp_path, token=None)
+    message_id = worker.enqueue("title", "body")
+    assert tokenless.drain_once() == 0
+    assert worker.status(message_id)["status"] == PENDING
+    assert server.received == []
+    assert worker.drain_once() == 1
+    assert server.received[0][0] == "good-token"
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming_indicators import EMA, MACD, RSI, SMA, Bollinger, IndicatorRegistry, RollingStd
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(7)
+    return pd.Series(100 + rng.standard_normal(300).cumsum(), index=pd.bdate_range("2023-01-02", periods=300))
+
+
+def streamed(kernel, values):
+    return [kernel.update(v) for v in values]
+
+
+def assert_matches(actual, expected):
+    expected = expected.to_numpy()
+    for got, want in zip(actual, expected):
+        if np.isnan(want):
+            assert got is None
+        else:
+            assert got == pytest.approx(want, rel=1e-9)
+
+
+def test_sma_matches_rolling_mean(closes):
+    assert_matches(streamed(SMA(15), closes), closes.rolling(15).mean())
+
+
+def test_ema_matches_ewm(closes):
+    assert_matches(streamed(EMA(20), closes), closes.ewm(span=20, adjust=False).mean())
+
+
+def test_rolling_std_matches_pandas(closes):
+    assert_matches(streamed(RollingStd(20), closes), closes.rolling(20).std())
+
+
+def test_bollinger_matches_pandas(closes):
+    bands = streamed(Bollinger(20, 2.0), closes)
+    mid = closes.rolling(20).mean()
+    std = closes.rolling(20).std()
+    assert_matches([b and b[0] for b in bands], mid)
+    assert_matches([b and b[1] for b in bands], mid + 2 * std)
+    assert_matches([b and b[2] for b in bands], mid - 2 * std)
+
+
+def test_rsi_matches_wilder_ewm(closes):
+    delta = closes.diff().iloc[1:]
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+    expected = pd.concat([pd.Series([np.nan]), 100 - 100 / (1 + gain / loss)])
+    assert_matches(streamed(RSI(14), closes), expected)
+
+
+def test_macd_matches_pandas(closes):
+    macd = closes.ewm(span=12, adjust=False).mean() - closes.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    values = streamed(MACD(12, 26, 9), closes)
+    assert_matches([v[0] for v in values], macd)
+    assert_matches([v[1] for v in values], signal)
+    assert_matches([v[2] for v in values], macd - signal)
+
+
+@pytest.mark.parametrize("kernel", [SMA, EMA, RollingStd, Bollinger, RSI, MACD])
+def test_revising_latest_bar_matches_history(closes, kernel):
+    revised = closes.copy()
+    revised.iloc[-1] += 3.0
+    live = kernel.from_history(closes)
+    live.update(closes.iloc[-1] - 1.0, new_bar=False)
+    assert live.update(revised.iloc[-1], new_bar=False) == pytest.approx(kernel.from_history(revised).value)
+
+
+def test_registry_syncs_new_and_revised_bars(closes):
+    registry = IndicatorRegistry()
+    registry.sync("AAPL", closes.iloc[:-2])
+    revised = closes.copy()
+    revised.iloc[-3] += 1.5
+    values = registry.sync("AAPL", revised)
+    fresh = IndicatorRegistry().sync("AAPL", revised)
+    for name, value in fresh.items():
+        assert values[name] == pytest.approx(value)
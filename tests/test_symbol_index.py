@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pandas as pd
+
+import symbol_index
+from symbol_index import SymbolIndex
+
+
+def index():
+    return SymbolIndex(["AAPL", "BRK-B", "MSFT"], ["Apple", "Berkshire B", "Microsoft"])
+
+
+def test_share_class_dot_maps_to_listed_dash():
+    known, unknown = index().validate(["brk.b", "BRK-B", "aapl"])
+    assert known == ["BRK-B", "AAPL"]
+    assert unknown == []
+    assert "BRK.B" in index()
+    assert index().name("brk.b") == "Berkshire B"
+
+
+def test_yahoo_only_forms_pass_unchanged():
+    symbols = ["005930.KS", "SHOP.TO", "^GSPC", "BTC-USD", "ES=F", "EURUSD=X"]
+    known, unknown = index().validate(symbols)
+    assert known == symbols
+    assert unknown == []
+
+
+def test_unlisted_symbols_are_left_for_probing():
+    assert index().validate(["PLTR", "MSFT"]) == (["MSFT"], ["PLTR"])
+
+
+def test_empty_index_accepts_everything_as_typed():
+    assert SymbolIndex([]).validate(["005930.ks", "pltr"]) == (["005930.KS", "PLTR"], [])
+
+
+def test_probe_keeps_symbols_with_upstream_bars(monkeypatch):
+    bars = pd.DataFrame({"Close": [1.0]}, index=pd.to_datetime(["2024-01-02"]))
+    upstream = {"PLTR": bars, "XYZQ": bars.iloc[:0]}
+    batches = []
+
+    def fetch(tickers, *args, **kwargs):
+        batches.append(tickers)
+        return {t: upstream[t] for t in tickers if t in upstream}
+
+    monkeypatch.setattr(symbol_index, "fetch_watchlist", fetch)
+    assert symbol_index.probe(["PLTR", "XYZQ", "QQQQ"]) == ["PLTR"]
+    # One symbol per call, so misses are negative-cached instead of read as an outage
+    assert sorted(batches) == [["PLTR"], ["QQQQ"], ["XYZQ"]]
+    assert symbol_index.probe([]) == []
+
+
+def test_share_class_suffixes_become_dashes():
+    known, unknown = SymbolIndex(["AAPL"]).validate(["bf.b", "HEI.A", "SHOP.TO"])
+    assert known == ["SHOP.TO"]
+    assert unknown == ["BF-B", "HEI-A"]
+
+
+def test_prober_answers_off_the_callers_thread(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(symbol_index, "probe", lambda symbols, priority: gate.wait(5) and ["PLTR"])
+    prober = symbol_index.Prober()
+    assert prober.submit(["PLTR", "XYZQ"]) == ["PLTR", "XYZQ"]
+    assert prober.result("PLTR") is None
+    # Already in flight: a second session does not probe again
+    assert prober.submit(["PLTR"]) == []
+    gate.set()
+    deadline = time.monotonic() + 5
+    while prober.result("XYZQ") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert prober.result("PLTR") is True
+    assert prober.result("XYZQ") is False
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from bar_store import LEVELS, OHLCV, SMA_COLUMN, bar_store, level_for
+from bulk_fetch import peek_watchlist, prefetch_watchlist
+from indicators import compute_bands
+from market_calendar import NY_TZ
+from request_scheduler import CARD
+
+# Base series actually fetched, with how far back each goes. Yahoo serves 1m bars
+# for about a week and 5m bars for about 60 days; everything else is resampled.
+BASES = {
+    "1m": timedelta(days=7),
+    "5m": timedelta(days=59),
+    "1d": timedelta(days=2 * 365 + 7),
+}
+# Bar size -> (base it is built from, pandas resample rule or None when it is the base)
+BARS = {
+    "1m": ("1m", None),
+    "5m": ("5m", None),
+    "15m": ("5m", "15min"),
+    "1h": ("5m", "1h"),
+    "1d": ("1d", None),
+}
+# Selector -> (bar size, lookback). Intraday lookbacks count sessions, daily ones
+# calendar days; weekly and monthly bars come precomputed from the bar store.
+TIMEFRAMES = {
+    "1D": ("5m", 1),
+    "5D": ("15m", 5),
+    "1M": ("1h", 21),
+    "6M": (level_for(183), 183),
+    "1Y": (level_for(365), 365),
+    "5Y": (level_for(5 * 365), 5 * 365),
+    "10Y": (level_for(10 * 365), 10 * 365),
+    "20Y": (level_for(20 * 365), 20 * 365),
+    "1m": ("1m", 1),
+    "5m": ("5m", 5),
+    "15m": ("15m", 20),
+    "1h": ("1h", 40),
+}
+DEFAULT_TIMEFRAME = "1Y"
+
+
+def base_frame(ticker, base, end=None, priority=CARD):
+    end = end or datetime.today()
+    # A fixed window per base keeps one cache entry shared by every timeframe built on it
+    start, stop = end - BASES[base], end + timedelta(days=1)
+    # Never waits on the network: serve what is cached, even stale, and refresh
+    # behind it; a cold base is None until the refresh lands
+    frames, _, stale = peek_watchlist([ticker], start, stop, interval=base)
+    prefetch_watchlist(stale, start, stop, interval=base, priority=priority)
+    df = frames.get(ticker.strip().upper())
+    if df is None or df.empty:
+        return None
+    if df.index.tz is not None:
+        # Plot in exchange time; epoch values of a tz-aware index would render as UTC
+        df.index = df.index.tz_convert(NY_TZ).tz_localize(None)
+    return df
+
+
+def resample_bars(df, rule):
+    agg = {c: how for c, how in OHLCV.items() if c in df.columns}
+    # Intraday bars are labelled by their start; hourly ones begin at the 9:30 open
+    offset = "30min" if rule == "1h" else None
+    out = df.resample(rule, offset=offset, label="left", closed="left").agg(agg)
+    return out.dropna(subset=["Close"])
+
+
+def timeframe_frame(ticker, name, end=None):
+    bar, lookback = TIMEFRAMES[name]
+    base, rule = BARS[bar]
+    df = base_frame(ticker, base, end)
+    if df is None:
+        return None
+    if base == "1d":
+        df = df.loc[df.index >= df.index[-1] - timedelta(days=lookback)]
+    else:
+        sessions = df.index.normalize().unique()[-lookback:]
+        df = df.loc[df.index >= sessions[0]]
+    return resample_bars(df, rule) if rule else df
+
+
+def level_bands(ticker, level, lookback, end=None, priority=CARD):
+    end = end or datetime.today()
+    start = end - timedelta(days=lookback)
+    # A background refresh keeps the daily store current; merging new days
+    # updates the aggregate levels, which are read here as they stand
+    prefetch_watchlist([ticker], start, end + timedelta(days=1), priority=priority)
+    df = bar_store.load_level(ticker, level)
+    df = df.loc[df.index >= pd.Timestamp(start)]
+    if df.empty:
+        return None
+    return pd.DataFrame({
+        "Adj Close": df["Close"],
+        SMA_COLUMN: df[SMA_COLUMN],
+        "Upper": df["Upper"],
+        "Lower": df["Lower"],
+    })
+
+
+def timeframe_bands(ticker, name, end=None):
+    # Same columns as BandMatrix.frame, so card figures render any timeframe
+    bar, lookback = TIMEFRAMES[name]
+    if bar in LEVELS:
+        return level_bands(ticker.strip().upper(), bar, lookback, end)
+    df = timeframe_frame(ticker, name, end)
+    if df is None or df.empty:
+        return None
+    bands = compute_bands({ticker: df})
+    if ticker not in bands.latest.index:
+        return None
+    return bands.frame(ticker)